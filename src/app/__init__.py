@@ -23,12 +23,14 @@ kv_store = ModelKeyValueStore(
     name="order_mapping",
     save_dir=SRC_PATH / "data" / "store",
     model=LpkStoreModel,
+    backend=config.KV_STORE_BACKEND,
 )
 
 eli_kv_store = ModelKeyValueStore(
     name="eli_order_mapping",
     save_dir=SRC_PATH / "data" / "store",
     model=EliStoreModel,
+    backend=config.KV_STORE_BACKEND,
 )
 
 
@@ -1,11 +1,14 @@
 import asyncio
 import httpx
+import importlib.util
 import json
 
 from typing import Final
 
 from app import config
 from app.paths import SRC_PATH
+from app.shared.enums import Upstream
+from app.shared.retry import async_retry
 
 
 from .models import (
@@ -19,53 +22,71 @@ from . import logger
 
 ELITEDIAS_BASE_URL: Final[str] = "https://dev.api.elitedias.com"
 
+# HTTP/2 needs the optional `h2` package (`httpx[http2]`)
+HTTP2_AVAILABLE: Final[bool] = importlib.util.find_spec("h2") is not None
+
 
 class ElitediasAPIClient:
-    def __init__(self) -> None:
+    def __init__(self, base_url: str = ELITEDIAS_BASE_URL) -> None:
         self.headers = {
             "Origin": config.ORIGIN,
             "Content-Type": "application/json",
             "User-Agent": "PostmanRuntime/7.44.1",
         }
-        self.base_url = ELITEDIAS_BASE_URL
+        self.base_url = base_url
+        # One long-lived pool for every call, closed with the app lifespan
+        self.http_client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=60,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=20,
+                max_keepalive_connections=10,
+                keepalive_expiry=120,
+            ),
+        )
+
+        # Provider-wide cap on in-flight top-up creations
+        self.topup_semaphore = asyncio.Semaphore(config.ELITEDIAS_TOPUP_CONCURRENCY)
+
+    async def aclose(self) -> None:
+        await self.http_client.aclose()
 
     async def get_available_games(self) -> AvailableGameResponse:
-        async with httpx.AsyncClient(headers=self.headers) as client:
-            res = await client.post(
-                f"{self.base_url}/elitedias_games_available",
-                json={
-                    "api_key": config.ALITEDIAS_API_KEY,
-                },
-                timeout=60,
-            )
+        res = await self.http_client.post(
+            f"{self.base_url}/elitedias_games_available",
+            json={
+                "api_key": config.ALITEDIAS_API_KEY,
+            },
+            timeout=60,
+        )
 
-            try:
-                res.raise_for_status()
+        try:
+            res.raise_for_status()
 
-            except httpx.HTTPStatusError as e:
-                logger.exception(e)
-                logger.info(res.text)
-                res.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            logger.exception(e)
+            logger.info(res.text)
+            res.raise_for_status()
 
-            return AvailableGameResponse.model_validate(res.json())
+        return AvailableGameResponse.model_validate(res.json())
 
     async def get_denominations(self, game: str) -> dict[str, str]:
-        async with httpx.AsyncClient(headers=self.headers) as client:
-            res = await client.post(
-                f"{self.base_url}/elitedias_api_denominations",
-                json={"api_key": config.ALITEDIAS_API_KEY, "game": game},
-                timeout=60,
-            )
+        res = await self.http_client.post(
+            f"{self.base_url}/elitedias_api_denominations",
+            json={"api_key": config.ALITEDIAS_API_KEY, "game": game},
+            timeout=60,
+        )
 
-            try:
-                res.raise_for_status()
+        try:
+            res.raise_for_status()
 
-            except httpx.HTTPStatusError as e:
-                logger.exception(e)
-                logger.info(res.text)
-                res.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            logger.exception(e)
+            logger.info(res.text)
+            res.raise_for_status()
 
-            return res.json()
+        return res.json()
 
     async def get_price(self, game: str, denom: str) -> float:
         denom_dict = await self.get_denominations(game)
@@ -83,97 +104,94 @@ class ElitediasAPIClient:
                     code="200",
                     info=ElitediasGameFieldsInfo(fields=[], notes=cached_data[game]),
                 )
-        async with httpx.AsyncClient(headers=self.headers) as client:
-            res = await client.post(
-                f"{self.base_url}/elitedias_game_fields",
-                json={"api_key": config.ALITEDIAS_API_KEY, "game": game},
-                timeout=60,
-            )
+        res = await self.http_client.post(
+            f"{self.base_url}/elitedias_game_fields",
+            json={"api_key": config.ALITEDIAS_API_KEY, "game": game},
+            timeout=60,
+        )
 
-            try:
-                res.raise_for_status()
+        try:
+            res.raise_for_status()
 
-            except httpx.HTTPStatusError as e:
-                logger.exception(e)
-                logger.info(res.text)
-                res.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            logger.exception(e)
+            logger.info(res.text)
+            res.raise_for_status()
 
-            await asyncio.sleep(10)
+        await asyncio.sleep(10)
 
-            model_response = ElitediasGameFields.model_validate(res.json())
+        model_response = ElitediasGameFields.model_validate(res.json())
 
-            cached_data[game] = model_response.info.notes
-            with open(SRC_PATH / "data" / "game_notes.json", "w") as f:
-                json.dump(cached_data, f, indent=4)
+        cached_data[game] = model_response.info.notes
+        with open(SRC_PATH / "data" / "game_notes.json", "w") as f:
+            json.dump(cached_data, f, indent=4)
 
-            return model_response
+        return model_response
 
     async def get_elitedias_game_fields(self, game: str) -> dict:
-        async with httpx.AsyncClient(headers=self.headers) as client:
-            res = await client.post(
-                f"{self.base_url}/elitedias_game_fields",
-                json={"api_key": config.ALITEDIAS_API_KEY, "game": game},
-                timeout=60,
-            )
+        res = await self.http_client.post(
+            f"{self.base_url}/elitedias_game_fields",
+            json={"api_key": config.ALITEDIAS_API_KEY, "game": game},
+            timeout=60,
+        )
 
-            try:
-                res.raise_for_status()
+        try:
+            res.raise_for_status()
 
-            except httpx.HTTPStatusError as e:
-                logger.exception(e)
-                logger.info(res.text)
-                res.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            logger.exception(e)
+            logger.info(res.text)
+            res.raise_for_status()
 
-            return res.json()
+        return res.json()
 
     async def create_topup(
         self,
         payload: dict,
     ) -> CreateTopUpResponse:
-        async with httpx.AsyncClient(headers=self.headers) as client:
-            payload.update(
-                {
-                    "api_key": config.ALITEDIAS_API_KEY,
-                }
-            )
-
-            res = await client.post(
-                f"{self.base_url}/elitedias_reseller_topup_api",
-                json=payload,
-                timeout=60,
-            )
-
-            try:
-                res.raise_for_status()
-                return CreateTopUpResponse.model_validate(res.json())
-
-            except Exception as e:
-                logger.exception(e)
-                logger.info(res.text)
-                raise e
-
+        payload.update(
+            {
+                "api_key": config.ALITEDIAS_API_KEY,
+            }
+        )
+
+        res = await self.http_client.post(
+            f"{self.base_url}/elitedias_reseller_topup_api",
+            json=payload,
+            timeout=60,
+        )
+
+        try:
+            res.raise_for_status()
+            return CreateTopUpResponse.model_validate(res.json())
+
+        except Exception as e:
+            logger.exception(e)
+            logger.info(res.text)
+            raise e
+
+    @async_retry(Upstream.ELITEDIAS, max_retries=2, base_delay=1)
     async def track_order(
         self,
         order_id: str,
     ) -> TrackOrderResponse:
-        async with httpx.AsyncClient(headers=self.headers) as client:
-            res = await client.post(
-                f"{self.base_url}/track_order",
-                json={
-                    "api_key": config.ALITEDIAS_API_KEY,
-                    "order_id": order_id,
-                },
-                timeout=60,
-            )
-
-            try:
-                res.raise_for_status()
-                return TrackOrderResponse.model_validate(res.json())
-
-            except Exception as e:
-                logger.exception(e)
-                logger.info(res.text)
-                raise e
+        res = await self.http_client.post(
+            f"{self.base_url}/track_order",
+            json={
+                "api_key": config.ALITEDIAS_API_KEY,
+                "order_id": order_id,
+            },
+            timeout=60,
+        )
+
+        try:
+            res.raise_for_status()
+            return TrackOrderResponse.model_validate(res.json())
+
+        except Exception as e:
+            logger.exception(e)
+            logger.info(res.text)
+            raise e
 
 
 elitedias_api_client = ElitediasAPIClient()
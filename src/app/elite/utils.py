@@ -0,0 +1,110 @@
+import asyncio
+import httpx
+
+from typing import Final
+
+from app import config
+
+from . import logger
+from .api_client import elitedias_api_client
+
+ELI_TOPUP_SUCCESS_KEY = "success"
+
+# Raised before the request reached Elitedias, no top-up was created
+UNSENT_ERRORS: Final[tuple[type[Exception], ...]] = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+)
+
+
+def is_topup_rejected(exc: Exception) -> bool:
+    """
+    Whether a failed top-up is known not to have been created: it was never
+    sent, or Elitedias answered with a client error. Timeouts after sending,
+    5xx and unreadable responses are ambiguous, the top-up may exist.
+    """
+    if isinstance(exc, UNSENT_ERRORS):
+        return True
+
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code < 500
+
+    return False
+
+
+async def create_topup_unit(
+    payload: dict,
+) -> tuple[str | None, str | None, bool]:
+    """
+    Create one Elitedias top-up, bounded by the provider concurrency limit.
+
+    Returns:
+        tuple[str | None, str | None, bool]: Elitedias order id on success,
+            else the failed reason, and whether the top-up can be re-issued
+            without risking a duplicate.
+    """
+    async with elitedias_api_client.topup_semaphore:
+        try:
+            # Own copy: create_topup adds the api key to the payload
+            res = await elitedias_api_client.create_topup(dict(payload))
+        except Exception as e:
+            logger.exception(e)
+            return None, str(e), is_topup_rejected(e)
+
+    if res.order_id is None or (res.status and ELI_TOPUP_SUCCESS_KEY not in res.status):
+        logger.info(f"Failed to create Elitedias. Reason: {res.message}")
+        return None, res.message, True
+
+    return res.order_id, None, False
+
+
+async def create_topups(
+    payload: dict,
+    quantity: int,
+    max_rounds: int = config.ELITEDIAS_TOPUP_MAX_ROUNDS,
+    retry_interval: float = 5,
+) -> tuple[list[str], str | None]:
+    """
+    Create `quantity` Elitedias top-ups concurrently.
+
+    Every round fans out only the units that are still missing, so units that
+    already succeeded are never re-submitted. Units that failed ambiguously
+    (the top-up may have been created) are never re-submitted either, Elitedias
+    takes no client reference to deduplicate them.
+
+    Returns:
+        tuple[list[str], str | None]: Created Elitedias order ids (may be fewer
+            than `quantity`) and the last failed reason, if any.
+    """
+    eli_order_ids: list[str] = []
+    unknown_count = 0
+    failed_reason: str | None = None
+
+    for attempt in range(max_rounds):
+        missing = quantity - len(eli_order_ids) - unknown_count
+        if missing <= 0:
+            break
+
+        if attempt > 0:
+            logger.info(f"Retrying {missing} rejected Elitedias top-up(s)")
+            await asyncio.sleep(retry_interval)
+
+        results = await asyncio.gather(
+            *(create_topup_unit(payload) for _ in range(missing))
+        )
+        for eli_order_id, reason, retryable in results:
+            if eli_order_id:
+                eli_order_ids.append(eli_order_id)
+            else:
+                failed_reason = reason
+                if not retryable:
+                    unknown_count += 1
+
+    if unknown_count:
+        failed_reason = (
+            f"{unknown_count} top-up(s) may have been created, check Elitedias "
+            f"before re-issuing them. Last reason: {failed_reason}"
+        )
+
+    return eli_order_ids, failed_reason
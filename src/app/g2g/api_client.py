@@ -1,10 +1,11 @@
 import hashlib
 import hmac
+import time
 
-from datetime import datetime
+from functools import lru_cache
 
-from typing import cast
-from httpx import Client, HTTPStatusError
+from typing import Any, cast
+from httpx import AsyncClient, Client, HTTPStatusError, Limits, Response
 
 from .. import config
 from . import logger
@@ -26,7 +27,41 @@ from .models import (
     DeliveryCode,
 )
 from .exceptions import G2GAPIError
-from ..shared.decorators import retry_on_fail
+from .offer_cache import offer_cache
+from ..shared.enums import Upstream
+from ..shared.retry import retry, async_retry
+
+
+# The secret key never changes, its HMAC key schedule is computed once and
+# copied for every signature
+SIGNATURE_HMAC = hmac.new(
+    key=config.G2G_SECRET_KEY.encode("utf8"),
+    digestmod=hashlib.sha256,
+)
+CANONICAL_SUFFIX = config.G2G_API_KEY + config.G2G_ACCOUNT_ID
+
+
+@lru_cache(maxsize=1024)
+def generate_signature(canonical_url: str, timestamp: str) -> str:
+    """
+    HMAC-SHA256 signature of a request, cached by URL and timestamp second.
+    """
+    signature_hmac = SIGNATURE_HMAC.copy()
+    signature_hmac.update((canonical_url + CANONICAL_SUFFIX + timestamp).encode("utf8"))
+    return signature_hmac.hexdigest()
+
+
+def generate_authorization_header(canonical_url: str) -> AuthorizationHeader:
+    timestamp = str(int(time.time()))  # g2g-timestamp
+
+    authorization_header: AuthorizationHeader = {
+        "g2g-api-key": config.G2G_API_KEY,
+        "g2g-userid": config.G2G_ACCOUNT_ID,
+        "g2g-signature": generate_signature(canonical_url, timestamp),
+        "g2g-timestamp": timestamp,
+        "Content-Type": "application/json",
+    }
+    return authorization_header
 
 
 class G2GAPIClient:
@@ -36,33 +71,13 @@ class G2GAPIClient:
             timeout=20,
         )
 
-    @retry_on_fail(max_retries=3, sleep_interval=2)
     def generate_authorization_header(
         self,
         canonical_url: str,
     ) -> AuthorizationHeader:
-        secret_key = config.G2G_SECRET_KEY
-        api_key = config.G2G_API_KEY  # Your API Key
-        user_id = config.G2G_ACCOUNT_ID  # Your User ID
-        timestamp = str(int(datetime.now().timestamp()))  # g2g-timestamp
-
-        canonical_string = canonical_url + api_key + user_id + str(timestamp)
-        signature = hmac.new(
-            key=bytes(secret_key.encode("utf8")),
-            msg=bytes(canonical_string.encode("utf8")),
-            digestmod=hashlib.sha256,
-        ).hexdigest()
-
-        authorization_header: AuthorizationHeader = {
-            "g2g-api-key": config.G2G_API_KEY,
-            "g2g-userid": config.G2G_ACCOUNT_ID,
-            "g2g-signature": signature,
-            "g2g-timestamp": timestamp,
-            "Content-Type": "application/json",
-        }
-        return authorization_header
+        return generate_authorization_header(canonical_url)
 
-    @retry_on_fail(max_retries=3, sleep_interval=2)
+    @retry(Upstream.G2G, max_retries=3, base_delay=2)
     def get_service(
         self,
     ) -> ResponseModel[ServicePayload]:
@@ -73,11 +88,15 @@ class G2GAPIClient:
         try:
             res.raise_for_status()
         except HTTPStatusError:
-            raise G2GAPIError(status_code=res.status_code, detail=res.text)
+            raise G2GAPIError(
+                status_code=res.status_code,
+                detail=res.text,
+                retry_after=res.headers.get("Retry-After"),
+            )
 
         return ResponseModel[ServicePayload].model_validate(res.json())
 
-    @retry_on_fail(max_retries=3, sleep_interval=2)
+    @retry(Upstream.G2G, max_retries=3, base_delay=2)
     def get_brand(
         self,
         service_id: str,
@@ -90,11 +109,15 @@ class G2GAPIClient:
         try:
             res.raise_for_status()
         except HTTPStatusError:
-            raise G2GAPIError(status_code=res.status_code, detail=res.text)
+            raise G2GAPIError(
+                status_code=res.status_code,
+                detail=res.text,
+                retry_after=res.headers.get("Retry-After"),
+            )
 
         return ResponseModel[BrandPayLoad].model_validate(res.json())
 
-    @retry_on_fail(max_retries=3, sleep_interval=2)
+    @retry(Upstream.G2G, max_retries=3, base_delay=2)
     def get_product(
         self,
         category_id: str | None = None,
@@ -124,13 +147,17 @@ class G2GAPIClient:
                 res.raise_for_status()
             except HTTPStatusError:
                 logger.error(res.text)
-                raise G2GAPIError(status_code=res.status_code, detail=res.text)
+                raise G2GAPIError(
+                    status_code=res.status_code,
+                    detail=res.text,
+                    retry_after=res.headers.get("Retry-After"),
+                )
 
             return ResponseModel[ProductPayload].model_validate(res.json())
 
         raise G2GAPIError(status_code=400, detail="Invalid query parameter")
 
-    @retry_on_fail(max_retries=3, sleep_interval=2)
+    @retry(Upstream.G2G, max_retries=3, base_delay=2)
     def get_attribute(
         self,
         product_id: str,
@@ -143,11 +170,15 @@ class G2GAPIClient:
         try:
             res.raise_for_status()
         except HTTPStatusError:
-            raise G2GAPIError(status_code=res.status_code, detail=res.text)
+            raise G2GAPIError(
+                status_code=res.status_code,
+                detail=res.text,
+                retry_after=res.headers.get("Retry-After"),
+            )
 
         return ResponseModel[AttributePayload].model_validate(res.json())
 
-    @retry_on_fail(max_retries=3, sleep_interval=2)
+    @retry(Upstream.G2G, max_retries=3, base_delay=2)
     def get_offer(
         self,
         offer_id: str,
@@ -164,11 +195,15 @@ class G2GAPIClient:
             res.raise_for_status()
         except HTTPStatusError:
             logger.error(res.text)
-            raise G2GAPIError(status_code=res.status_code, detail=res.text)
+            raise G2GAPIError(
+                status_code=res.status_code,
+                detail=res.text,
+                retry_after=res.headers.get("Retry-After"),
+            )
 
         return ResponseModel[GetOfferResponse].model_validate(res.json())
 
-    # @retry_on_fail(max_retries=3, sleep_interval=2)
+    # @retry(Upstream.G2G, max_retries=3, base_delay=2)
     def create_offer(
         self, create_offer_request: CreateOfferRequest
     ) -> ResponseModel[CreateOfferResponse]:
@@ -183,11 +218,15 @@ class G2GAPIClient:
         try:
             res.raise_for_status()
         except HTTPStatusError:
-            raise G2GAPIError(status_code=res.status_code, detail=res.text)
+            raise G2GAPIError(
+                status_code=res.status_code,
+                detail=res.text,
+                retry_after=res.headers.get("Retry-After"),
+            )
 
         return ResponseModel[CreateOfferResponse].model_validate(res.json())
 
-    @retry_on_fail(max_retries=3, sleep_interval=2)
+    @retry(Upstream.G2G, max_retries=3, base_delay=2)
     def update_offer(
         self,
         offer_id: str,
@@ -196,19 +235,24 @@ class G2GAPIClient:
         canonical_url = f"/{G2G_API_VERSION}/offers/{offer_id}"
         headers = self.generate_authorization_header(canonical_url)
 
-        res = self.http_client.patch(
-            canonical_url,
-            headers=cast(dict[str, str], headers),
-            json=update_offer_request.model_dump(mode="json"),
-        )
+        with offer_cache.invalidating(offer_id):
+            res = self.http_client.patch(
+                canonical_url,
+                headers=cast(dict[str, str], headers),
+                json=update_offer_request.model_dump(mode="json"),
+            )
         try:
             res.raise_for_status()
         except HTTPStatusError:
-            raise G2GAPIError(status_code=res.status_code, detail=res.text)
+            raise G2GAPIError(
+                status_code=res.status_code,
+                detail=res.text,
+                retry_after=res.headers.get("Retry-After"),
+            )
 
         return ResponseModel[CreateOfferResponse].model_validate(res.json())
 
-    @retry_on_fail(max_retries=3, sleep_interval=2)
+    @retry(Upstream.G2G, max_retries=3, base_delay=2)
     def delete_offer(
         self,
         offer_id: str,
@@ -216,18 +260,23 @@ class G2GAPIClient:
         canonical_url = f"/{G2G_API_VERSION}/offers/{offer_id}"
         headers = self.generate_authorization_header(canonical_url)
 
-        res = self.http_client.delete(
-            canonical_url,
-            headers=cast(dict[str, str], headers),
-        )
+        with offer_cache.invalidating(offer_id):
+            res = self.http_client.delete(
+                canonical_url,
+                headers=cast(dict[str, str], headers),
+            )
         try:
             res.raise_for_status()
         except HTTPStatusError:
-            raise G2GAPIError(status_code=res.status_code, detail=res.text)
+            raise G2GAPIError(
+                status_code=res.status_code,
+                detail=res.text,
+                retry_after=res.headers.get("Retry-After"),
+            )
 
         return ResponseModel[DeleteOfferResponse].model_validate(res.json())
 
-    @retry_on_fail(max_retries=3, sleep_interval=2)
+    @retry(Upstream.G2G, max_retries=3, base_delay=2)
     def search_offer(self):
         canonical_url = f"/{G2G_API_VERSION}/offers/search"
         headers = self.generate_authorization_header(canonical_url)
@@ -242,11 +291,15 @@ class G2GAPIClient:
         try:
             res.raise_for_status()
         except HTTPStatusError:
-            raise G2GAPIError(status_code=res.status_code, detail=res.text)
+            raise G2GAPIError(
+                status_code=res.status_code,
+                detail=res.text,
+                retry_after=res.headers.get("Retry-After"),
+            )
 
         logger.info(res.json())
 
-    @retry_on_fail(max_retries=3, sleep_interval=2)
+    @retry(Upstream.G2G, max_retries=3, base_delay=2)
     def get_order(
         self,
         order_id: str,
@@ -262,11 +315,15 @@ class G2GAPIClient:
             res.raise_for_status()
         except HTTPStatusError:
             logger.exception(res.text)
-            raise G2GAPIError(status_code=res.status_code, detail=res.text)
+            raise G2GAPIError(
+                status_code=res.status_code,
+                detail=res.text,
+                retry_after=res.headers.get("Retry-After"),
+            )
 
         return ResponseModel[Order].model_validate(res.json())
 
-    @retry_on_fail(max_retries=3, sleep_interval=2)
+    @retry(Upstream.G2G, max_retries=3, base_delay=2)
     def get_order_deliveries(
         self,
         order_id: str,
@@ -282,11 +339,15 @@ class G2GAPIClient:
             res.raise_for_status()
         except HTTPStatusError:
             logger.exception(res.text)
-            raise G2GAPIError(status_code=res.status_code, detail=res.text)
+            raise G2GAPIError(
+                status_code=res.status_code,
+                detail=res.text,
+                retry_after=res.headers.get("Retry-After"),
+            )
 
         return res.json()
 
-    @retry_on_fail(max_retries=2, sleep_interval=2)
+    @retry(Upstream.G2G, max_retries=2, base_delay=2)
     def patch_delivery_order(
         self,
         order_id: str,
@@ -305,11 +366,15 @@ class G2GAPIClient:
             res.raise_for_status()
         except HTTPStatusError:
             logger.exception(res.text)
-            raise G2GAPIError(status_code=res.status_code, detail=res.text)
+            raise G2GAPIError(
+                status_code=res.status_code,
+                detail=res.text,
+                retry_after=res.headers.get("Retry-After"),
+            )
 
         return ResponseModel[PathchDeliveryResponse].model_validate(res.json())
 
-    @retry_on_fail(max_retries=3, sleep_interval=2)
+    @retry(Upstream.G2G, max_retries=3, base_delay=2)
     def delivery_order_codes(
         self,
         order_id: str,
@@ -332,9 +397,213 @@ class G2GAPIClient:
             res.raise_for_status()
         except HTTPStatusError:
             logger.exception(res.text)
-            raise G2GAPIError(status_code=res.status_code, detail=res.text)
+            raise G2GAPIError(
+                status_code=res.status_code,
+                detail=res.text,
+                retry_after=res.headers.get("Retry-After"),
+            )
+
+        return ResponseModel[PathchDeliveryResponse].model_validate(res.json())
 
+
+class AsyncG2GAPIClient:
+    """
+    Asyncio counterpart of `G2GAPIClient` for the webhook server.
+
+    All requests share one pooled `httpx.AsyncClient`, so concurrent orders
+    reuse keep-alive connections instead of blocking the event loop.
+    """
+
+    def __init__(self) -> None:
+        self.http_client = AsyncClient(
+            base_url=f"{G2G_API_URL}",
+            timeout=20,
+            limits=Limits(max_connections=50, max_keepalive_connections=20),
+        )
+
+    async def aclose(self) -> None:
+        await self.http_client.aclose()
+
+    async def request(
+        self,
+        method: str,
+        canonical_url: str,
+        **kwargs: Any,
+    ) -> Response:
+        headers = generate_authorization_header(canonical_url)
+        res = await self.http_client.request(
+            method,
+            canonical_url,
+            headers=cast(dict[str, str], headers),
+            **kwargs,
+        )
+
+        try:
+            res.raise_for_status()
+        except HTTPStatusError:
+            logger.error(res.text)
+            raise G2GAPIError(
+                status_code=res.status_code,
+                detail=res.text,
+                retry_after=res.headers.get("Retry-After"),
+            )
+
+        return res
+
+    @async_retry(Upstream.G2G, max_retries=3, base_delay=1)
+    async def get_service(
+        self,
+    ) -> ResponseModel[ServicePayload]:
+        res = await self.request("GET", f"/{G2G_API_VERSION}/services")
+        return ResponseModel[ServicePayload].model_validate(res.json())
+
+    @async_retry(Upstream.G2G, max_retries=3, base_delay=1)
+    async def get_brand(
+        self,
+        service_id: str,
+    ) -> ResponseModel[BrandPayLoad]:
+        res = await self.request(
+            "GET", f"/{G2G_API_VERSION}/services/{service_id}/brands"
+        )
+        return ResponseModel[BrandPayLoad].model_validate(res.json())
+
+    @async_retry(Upstream.G2G, max_retries=3, base_delay=1)
+    async def get_product(
+        self,
+        category_id: str | None = None,
+        service_id: str | None = None,
+        brand_id: str | None = None,
+    ) -> ResponseModel[ProductPayload]:
+        if not (category_id or (service_id and brand_id)):
+            raise G2GAPIError(status_code=400, detail="Invalid query parameter")
+
+        query_params = {}
+        if category_id:
+            query_params["category_id"] = category_id
+
+        if service_id:
+            query_params["service_id"] = service_id
+
+        if brand_id:
+            query_params["brand_id"] = brand_id
+
+        res = await self.request(
+            "GET", f"/{G2G_API_VERSION}/products", params=query_params
+        )
+        return ResponseModel[ProductPayload].model_validate(res.json())
+
+    @async_retry(Upstream.G2G, max_retries=3, base_delay=1)
+    async def get_attribute(
+        self,
+        product_id: str,
+    ) -> ResponseModel[AttributePayload]:
+        res = await self.request(
+            "GET", f"/{G2G_API_VERSION}/products/{product_id}/attributes"
+        )
+        return ResponseModel[AttributePayload].model_validate(res.json())
+
+    @async_retry(Upstream.G2G, max_retries=3, base_delay=1)
+    async def get_offer(
+        self,
+        offer_id: str,
+    ) -> ResponseModel[GetOfferResponse]:
+        res = await self.request("GET", f"/v1/offers/{offer_id}")
+        return ResponseModel[GetOfferResponse].model_validate(res.json())
+
+    async def get_cached_offer(
+        self,
+        offer_id: str,
+    ) -> ResponseModel[GetOfferResponse]:
+        return await offer_cache.get(offer_id, self.get_offer)
+
+    async def create_offer(
+        self, create_offer_request: CreateOfferRequest
+    ) -> ResponseModel[CreateOfferResponse]:
+        res = await self.request(
+            "POST",
+            f"/{G2G_API_VERSION}/offers",
+            json=create_offer_request.model_dump(mode="json"),
+        )
+        return ResponseModel[CreateOfferResponse].model_validate(res.json())
+
+    @async_retry(Upstream.G2G, max_retries=3, base_delay=1)
+    async def update_offer(
+        self,
+        offer_id: str,
+        update_offer_request: CreateOfferRequest,
+    ) -> ResponseModel[CreateOfferResponse]:
+        with offer_cache.invalidating(offer_id):
+            res = await self.request(
+                "PATCH",
+                f"/{G2G_API_VERSION}/offers/{offer_id}",
+                json=update_offer_request.model_dump(mode="json"),
+            )
+        return ResponseModel[CreateOfferResponse].model_validate(res.json())
+
+    @async_retry(Upstream.G2G, max_retries=3, base_delay=1)
+    async def delete_offer(
+        self,
+        offer_id: str,
+    ) -> ResponseModel[DeleteOfferResponse]:
+        with offer_cache.invalidating(offer_id):
+            res = await self.request("DELETE", f"/{G2G_API_VERSION}/offers/{offer_id}")
+        return ResponseModel[DeleteOfferResponse].model_validate(res.json())
+
+    @async_retry(Upstream.G2G, max_retries=3, base_delay=1)
+    async def search_offer(self):
+        res = await self.request("POST", f"/{G2G_API_VERSION}/offers/search", json={})
+        logger.info(res.json())
+
+    @async_retry(Upstream.G2G, max_retries=3, base_delay=1)
+    async def get_order(
+        self,
+        order_id: str,
+    ) -> ResponseModel[Order]:
+        res = await self.request("GET", f"/{G2G_API_VERSION}/orders/{order_id}")
+        return ResponseModel[Order].model_validate(res.json())
+
+    @async_retry(Upstream.G2G, max_retries=3, base_delay=1)
+    async def get_order_deliveries(
+        self,
+        order_id: str,
+    ) -> dict:
+        res = await self.request(
+            "GET", f"/{G2G_API_VERSION}/orders/{order_id}/delivery"
+        )
+        return res.json()
+
+    @async_retry(Upstream.G2G, max_retries=2, base_delay=1)
+    async def patch_delivery_order(
+        self,
+        order_id: str,
+        delivery_id: str,
+        payload: PatchDeliveryPayload,
+    ) -> ResponseModel[PathchDeliveryResponse]:
+        logger.info(payload.model_dump_json())
+        res = await self.request(
+            "PATCH",
+            f"/{G2G_API_VERSION}/orders/{order_id}/delivery/{delivery_id}",
+            json=payload.model_dump(mode="json"),
+        )
+        return ResponseModel[PathchDeliveryResponse].model_validate(res.json())
+
+    @async_retry(Upstream.G2G, max_retries=3, base_delay=1)
+    async def delivery_order_codes(
+        self,
+        order_id: str,
+        delivery_id: str,
+        codes: list[DeliveryCode],
+    ) -> ResponseModel[PathchDeliveryResponse]:
+        res = await self.request(
+            "POST",
+            f"/{G2G_API_VERSION}/orders/{order_id}/delivery",
+            json={
+                "delivery_id": delivery_id,
+                "codes": [code.model_dump(mode="json") for code in codes],
+            },
+        )
         return ResponseModel[PathchDeliveryResponse].model_validate(res.json())
 
 
 g2g_api_client = G2GAPIClient()
+async_g2g_api_client = AsyncG2GAPIClient()
@@ -1,5 +1,12 @@
 class G2GAPIError(Exception):
-    def __init__(self, status_code: int, detail: str, *args: object) -> None:
+    def __init__(
+        self,
+        status_code: int,
+        detail: str,
+        *args: object,
+        retry_after: str | None = None,
+    ) -> None:
         super().__init__(*args)
         self.status_code = status_code
         self.detail = detail
+        self.retry_after = retry_after
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator
+
+from .. import config
+from . import logger
+from .models import ResponseModel, GetOfferResponse
+
+OfferResponse = ResponseModel[GetOfferResponse]
+OfferLoader = Callable[[str], Awaitable[OfferResponse]]
+
+
+class OfferCache:
+    """
+    TTL + LRU cache of G2G offers keyed by offer id.
+
+    Entries older than `refresh_ahead * ttl` are reloaded in the background
+    on their next hit, so hot offers never expire on the request path.
+    Offers we update or delete are invalidated before and after the write, a
+    load that was in flight during an invalidation is not stored: only the
+    load registered in `_inflight` may store its result.
+    """
+
+    def __init__(self, ttl: float, max_size: int, refresh_ahead: float = 0.8) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.refresh_ahead = refresh_ahead
+
+        # offer_id -> (loaded_at, offer), least recently used first
+        self._entries: OrderedDict[str, tuple[float, OfferResponse]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: dict[str, asyncio.Task[OfferResponse]] = {}
+
+    def _store(
+        self, offer_id: str, offer: OfferResponse, task: asyncio.Task | None
+    ) -> None:
+        with self._lock:
+            # Invalidated or superseded while loading
+            if self._inflight.get(offer_id) is not task:
+                return
+
+            self._entries[offer_id] = (time.monotonic(), offer)
+            self._entries.move_to_end(offer_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    async def _load(self, offer_id: str, loader: OfferLoader) -> OfferResponse:
+        offer = await loader(offer_id)
+        self._store(offer_id, offer, asyncio.current_task())
+        return offer
+
+    def _start_load(
+        self, offer_id: str, loader: OfferLoader
+    ) -> asyncio.Task[OfferResponse]:
+        with self._lock:
+            task = self._inflight.get(offer_id)
+            if task is None:
+                task = asyncio.create_task(self._load(offer_id, loader))
+                task.add_done_callback(self._on_load_done(offer_id))
+                self._inflight[offer_id] = task
+
+        return task
+
+    def _on_load_done(self, offer_id: str) -> Callable[[asyncio.Task], None]:
+        def callback(task: asyncio.Task) -> None:
+            with self._lock:
+                if self._inflight.get(offer_id) is task:
+                    del self._inflight[offer_id]
+            if not task.cancelled() and task.exception() is not None:
+                logger.error(f"Can not load offer {offer_id}: {task.exception()}")
+
+        return callback
+
+    async def get(self, offer_id: str, loader: OfferLoader) -> OfferResponse:
+        with self._lock:
+            entry = self._entries.get(offer_id)
+            if entry is not None:
+                self._entries.move_to_end(offer_id)
+
+        if entry is not None:
+            loaded_at, offer = entry
+            age = time.monotonic() - loaded_at
+            if age < self.ttl:
+                if age >= self.ttl * self.refresh_ahead:
+                    self._start_load(offer_id, loader)
+                return offer
+
+        # Concurrent misses of one offer share a single request
+        return await asyncio.shield(self._start_load(offer_id, loader))
+
+    def invalidate(self, offer_id: str) -> None:
+        with self._lock:
+            self._entries.pop(offer_id, None)
+            # The load started before the change is not stored, and later
+            # misses do not join it
+            self._inflight.pop(offer_id, None)
+
+    @contextmanager
+    def invalidating(self, offer_id: str) -> Iterator[None]:
+        """
+        Invalidate `offer_id` around a write to it: a read during the write
+        may load the old offer, it is dropped once the write is done.
+        """
+        self.invalidate(offer_id)
+        try:
+            yield
+        finally:
+            self.invalidate(offer_id)
+
+    async def stop(self) -> None:
+        with self._lock:
+            tasks = list(self._inflight.values())
+            self._inflight.clear()
+        for task in tasks:
+            task.cancel()
+
+
+offer_cache = OfferCache(
+    ttl=config.OFFER_CACHE_TTL,
+    max_size=config.OFFER_CACHE_MAX_SIZE,
+)
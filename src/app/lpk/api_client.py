@@ -13,7 +13,8 @@ from .models import (
     OrderStatusResponse,
     FXRateReponse,
 )
-from ..shared.decorators import retry_on_fail
+from ..shared.enums import Upstream
+from ..shared.retry import retry
 
 LPK_BASE_URL: Final[str] = "https://www.lapakgaming.com"
 
@@ -23,7 +24,7 @@ class LpkAPIClient:
         self.client = httpx.Client(timeout=60)
         self.base_url = LPK_BASE_URL
 
-    @retry_on_fail()
+    @retry(Upstream.LAPAK)
     def get_categories(self, country_code: str = "id") -> Response[CategoryResponse]:
         logger.info("API Get all product")
 
@@ -46,7 +47,7 @@ class LpkAPIClient:
         return Response[CategoryResponse].model_validate(res.json())
 
     # WARNING: Need to check before using
-    # @retry_on_fail()
+    # @retry(Upstream.LAPAK)
     # def get_products(
     #     self, category_code: str, country_code: str = "id"
     # ) -> Response[CategoryResponse]:
@@ -71,7 +72,7 @@ class LpkAPIClient:
     #     return Response[CategoryResponse].model_validate(res.json())
 
     # WARNING: Need to check before using
-    # @retry_on_fail()
+    # @retry(Upstream.LAPAK)
     # def get_product_with_code(self, code: str) -> None:
     #     logger.info("API Get all product")
 
@@ -93,7 +94,7 @@ class LpkAPIClient:
 
     #     return res.json()
 
-    @retry_on_fail()
+    @retry(Upstream.LAPAK)
     def get_all_products(self, country_code: str = "id") -> Response[ProductResponse]:
         logger.info("API Get all product")
 
@@ -115,7 +116,7 @@ class LpkAPIClient:
 
         return Response[ProductResponse].model_validate(res.json())
 
-    @retry_on_fail(max_retries=2, sleep_interval=5)
+    @retry(Upstream.LAPAK, max_retries=2, base_delay=5)
     def create_order(self, order: OrderPayload) -> CreatedOrderResposne:
         logger.info("API Create order")
 
@@ -138,7 +139,7 @@ class LpkAPIClient:
 
         return CreatedOrderResposne.model_validate(res.json())
 
-    @retry_on_fail()
+    @retry(Upstream.LAPAK)
     def get_order_status(self, tid: str) -> OrderStatusResponse:
         logger.info("API get order status")
 
@@ -160,7 +161,7 @@ class LpkAPIClient:
 
         return OrderStatusResponse.model_validate(res.json())
 
-    @retry_on_fail()
+    @retry(Upstream.LAPAK)
     def get_fx_rate(
         self, from_currency: str = "USD", to_currency: str = "IDR"
     ) -> Response[FXRateReponse]:
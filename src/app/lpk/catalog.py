@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+
+from .. import config
+from . import logger
+from .api_client import lpk_api_client
+from .consts import COUNTRY_CODES
+from .models import Product
+
+AVAILABLE_STATUS = "available"
+
+
+def build_catalog_index(products: list[Product]) -> dict[str, list[Product]]:
+    """
+    Group available products by code, each list sorted by ascending price.
+    """
+    index: dict[str, list[Product]] = {}
+    for product in products:
+        if product.status == AVAILABLE_STATUS:
+            index.setdefault(product.code, []).append(product)
+
+    for code_products in index.values():
+        code_products.sort(key=lambda product: product.price)
+
+    return index
+
+
+class LpkCatalogIndex:
+    """
+    In-memory Lapakgaming catalog keyed by product code.
+
+    The index is rebuilt from all countries when it is older than `ttl`
+    seconds, either by the background refresher or lazily on lookup.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+
+        self._index: dict[str, list[Product]] = {}
+        self._expires_at: float = 0
+        self._refresh_lock = threading.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    def is_expired(self) -> bool:
+        return time.monotonic() >= self._expires_at
+
+    def refresh(self) -> dict[str, list[Product]]:
+        with self._refresh_lock:
+            products: list[Product] = []
+            for country_code in COUNTRY_CODES:
+                products.extend(
+                    lpk_api_client.get_all_products(
+                        country_code=country_code
+                    ).data.products,
+                )
+
+            index = build_catalog_index(products)
+            self._index = index
+            self._expires_at = time.monotonic() + self.ttl
+
+        logger.info(f"Lapakgaming catalog index refreshed: {len(index)} codes")
+        return index
+
+    def get_index(self) -> dict[str, list[Product]]:
+        if self.is_expired():
+            try:
+                return self.refresh()
+            except Exception as e:
+                if not self._index:
+                    raise e
+                logger.exception(e)
+                logger.info("Serving stale Lapakgaming catalog index")
+
+        return self._index
+
+    def get_lowest_price(self, codes: list[str]) -> Product | None:
+        index = self.get_index()
+
+        min_product: Product | None = None
+        for code in codes:
+            code_products = index.get(code)
+            if code_products and (
+                min_product is None or code_products[0].price < min_product.price
+            ):
+                min_product = code_products[0]
+
+        return min_product
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            # Refresh ahead of expiry so lookups never wait for a rebuild
+            await asyncio.sleep(self.ttl * 0.8)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.exception(e)
+
+    async def start(self) -> None:
+        try:
+            await asyncio.to_thread(self.refresh)
+        except Exception as e:
+            logger.exception(e)
+            logger.info("Initial Lapakgaming catalog load failed, will load on demand")
+
+        self._refresh_task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+
+lpk_catalog_index = LpkCatalogIndex(ttl=config.LPK_CATALOG_TTL)
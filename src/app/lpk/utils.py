@@ -1,6 +1,10 @@
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Iterator
+
+from . import logger
 from .api_client import lpk_api_client
-from .models import Product
-from .consts import COUNTRY_CODES
+from .catalog import lpk_catalog_index
+from .models import Product, Category
 
 
 def to_product_dict(products: list[Product]) -> dict[str, Product]:
@@ -8,20 +12,92 @@ def to_product_dict(products: list[Product]) -> dict[str, Product]:
 
 
 def get_lowest_price_from_list_code(codes: list[str]) -> Product | None:
-    products: list[Product] = []
-    for country_code in COUNTRY_CODES:
-        products.extend(
-            lpk_api_client.get_all_products(country_code=country_code).data.products,
-        )
-
-    min_price: int = 99999999999999999999999
-    # min_code: str = products[0].code
-    min_product: Product | None = None
-    for product in products:
-        if product.code in codes and product.status == "available":
-            if product.price < min_price:
-                min_price = product.price
-                # min_code = product.code
-                min_product = product
-
-    return min_product
+    return lpk_catalog_index.get_lowest_price(codes)
+
+
+def fetch_country_categories(
+    country_codes: list[str],
+    max_workers: int,
+) -> dict[str, list[Category]]:
+    """
+    Fetch categories of every country in parallel.
+
+    A country whose request failed is logged and left out.
+
+    Args:
+        country_codes: Lapakgaming country codes.
+        max_workers: Maximum number of requests in flight.
+
+    Returns:
+        dict[str, list[Category]]: Country code -> categories.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures: dict[Future, str] = {
+            executor.submit(
+                lpk_api_client.get_categories, country_code=country_code
+            ): country_code
+            for country_code in country_codes
+        }
+
+        categories: dict[str, list[Category]] = {}
+        for future in as_completed(futures):
+            country_code = futures[future]
+            try:
+                categories[country_code] = future.result().data.categories
+            except Exception as e:
+                logger.exception(e)
+                logger.error(f"Can not fetch categories of country code {country_code}")
+
+    return categories
+
+
+def fetch_country_products(
+    country_codes: list[str],
+    max_workers: int,
+) -> Iterator[tuple[str, list[Product]]]:
+    """
+    Fetch products of every country in parallel.
+
+    Countries are yielded in `country_codes` order, each one as soon as it
+    and the countries before it are done. Only countries finished ahead of
+    an earlier one are held back. A country whose request failed is logged
+    and skipped, the other countries are still yielded.
+
+    Args:
+        country_codes: Lapakgaming country codes.
+        max_workers: Maximum number of requests in flight.
+
+    Returns:
+        Iterator[tuple[str, list[Product]]]: Country code and products of each
+            successfully fetched country.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures: dict[Future, str] = {
+            executor.submit(
+                lpk_api_client.get_all_products, country_code=country_code
+            ): country_code
+            for country_code in country_codes
+        }
+
+        # Country code -> products, None if the request failed
+        done: dict[str, list[Product] | None] = {}
+        next_position = 0
+
+        for future in as_completed(futures):
+            country_code = futures[future]
+            try:
+                done[country_code] = future.result().data.products
+            except Exception as e:
+                logger.exception(e)
+                logger.error(f"Can not fetch products of country code {country_code}")
+                done[country_code] = None
+
+            while (
+                next_position < len(country_codes)
+                and country_codes[next_position] in done
+            ):
+                country_code = country_codes[next_position]
+                products = done.pop(country_code)
+                next_position += 1
+                if products is not None:
+                    yield country_code, products
@@ -1,11 +1,40 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app import config
+from app.lpk.catalog import lpk_catalog_index
+from app.g2g.api_client import async_g2g_api_client
+from app.g2g.offer_cache import offer_cache
+from app.sheet.models import log_sheet_sink
+from app.shared.retry import get_retry_metrics
+from app.shared.enums import RequestPriority
+from app.sheet.rate_limit import get_sheets_rate_limit_metrics, sheets_priority_scope
+from app.elite.api_client import elitedias_api_client
 from .routes.g2g.router import router as g2g_router
 
 from .routes.lapak.router import router as lpk_router
+from .mapping_cache import product_mapping_cache
+from .scheduler import delivery_scheduler
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    await log_sheet_sink.start()
+    await product_mapping_cache.start()
+    await lpk_catalog_index.start()
+    await delivery_scheduler.start()
+    yield
+    await delivery_scheduler.stop()
+    await lpk_catalog_index.stop()
+    await product_mapping_cache.stop()
+    await offer_cache.stop()
+    await async_g2g_api_client.aclose()
+    await elitedias_api_client.aclose()
+    await log_sheet_sink.stop()
 
-app = FastAPI(title=config.APP_TITLE)
+
+app = FastAPI(title=config.APP_TITLE, lifespan=lifespan)
 
 origins = ["*"]
 
@@ -17,6 +46,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def order_sheets_priority(request: Request, call_next):
+    # Sheets calls made while handling webhooks come first
+    with sheets_priority_scope(RequestPriority.ORDER):
+        return await call_next(request)
+
+
 app.include_router(g2g_router)
 app.include_router(lpk_router)
 
@@ -24,3 +61,11 @@ app.include_router(lpk_router)
 @app.get("/")
 async def hello() -> str:
     return f"Hello from {config.APP_TITLE}"
+
+
+@app.get("/metrics")
+async def metrics() -> dict:
+    return {
+        "retries": get_retry_metrics(),
+        "sheets_rate_limit": get_sheets_rate_limit_metrics(),
+    }
@@ -1,5 +1,4 @@
 import asyncio
-import time
 
 from typing import Final
 
@@ -7,99 +6,144 @@ from datetime import datetime
 
 
 from app.lpk.api_client import lpk_api_client
-from app.g2g.api_client import g2g_api_client
+from app.g2g.api_client import async_g2g_api_client
 from app.elite.api_client import elitedias_api_client
 from app.g2g.models import PatchDeliveryPayload
-from app import logger, kv_store, eli_kv_store
+from app import config, logger, kv_store, eli_kv_store
 from app.shared.models import LpkStoreModel, EliStoreModel
-from app.shared.utils import afunc_retry
 from app.sheet.models import LogToSheet
+from app.shared.rate_limit import AsyncTokenBucket
 
 
 from .routes.lapak.utiles import is_success_order
 
 ELI_SUCCESS_KEY: Final[str] = "success"
-
-
-def check_lpk_order_status_cron_job(tid: str):
-    retry_time: int = 0
-    while True:
-        if retry_time > 3:
-            return
+ELI_TRACKER_KEY: Final[str] = "pending"
+
+eli_track_rate_limiter = AsyncTokenBucket(rate=config.ELITEDIAS_TRACK_RATE_LIMIT)
+
+
+async def check_lpk_order_status(tid: str) -> bool:
+    """
+    Check one Lapakgaming order and deliver it on G2G once it succeeded.
+
+    Returns:
+        bool: True when the order needs no further checks.
+    """
+    logger.info(f"Checking lpk order status with tid: {tid}")
+    mapped_order: LpkStoreModel | None = kv_store.get(tid)
+    if mapped_order is None:
+        return True
+
+    order_status_res = await asyncio.to_thread(lpk_api_client.get_order_status, tid=tid)
+    if not is_success_order(order_status_res):
+        return False
+
+    await async_g2g_api_client.patch_delivery_order(
+        order_id=mapped_order.order_id,
+        delivery_id=mapped_order.delivery_id,
+        payload=PatchDeliveryPayload(
+            delivered_qty=mapped_order.quantity,
+            delivered_at=int(
+                datetime.now().timestamp(),
+            ),
+        ),
+    )
+    await asyncio.to_thread(
+        LogToSheet.note_delivery,
+        mapped_order.log_index,
+        f"Delivery success for order id: {mapped_order.order_id}",
+    )
+
+    kv_store.delete(tid)
+    return True
+
+
+async def track_eli_order(eli_order_id: str) -> bool:
+    await eli_track_rate_limiter.acquire()
+    track_order_res = await elitedias_api_client.track_order(eli_order_id)
+    logger.info(track_order_res)
+    return ELI_SUCCESS_KEY in track_order_res.order_status
+
+
+async def deliver_eli_order(
+    g2g_order_id: str,
+    mapped_order: EliStoreModel,
+    successful_order_ids: set[str],
+) -> None:
+    remaining_order_ids = [
+        eli_order_id
+        for eli_order_id in mapped_order.eli_order_ids
+        if eli_order_id not in successful_order_ids
+    ]
+
+    if remaining_order_ids:
+        if len(remaining_order_ids) < len(mapped_order.eli_order_ids):
+            mapped_order.eli_order_ids = remaining_order_ids
+            eli_kv_store.set(g2g_order_id, mapped_order)
+        return
+
+    await async_g2g_api_client.patch_delivery_order(
+        order_id=g2g_order_id,
+        delivery_id=mapped_order.delivery_id,
+        payload=PatchDeliveryPayload(
+            delivered_qty=mapped_order.quantity,
+            delivered_at=int(
+                datetime.now().timestamp(),
+            ),
+        ),
+    )
+    await asyncio.to_thread(
+        LogToSheet.note_delivery,
+        mapped_order.log_index,
+        f"Delivery success for order id: {g2g_order_id}",
+    )
+    eli_kv_store.delete(g2g_order_id)
+
+
+async def track_pending_eli_orders(_: str = ELI_TRACKER_KEY) -> bool:
+    """
+    Track every pending Elitedias order of every G2G order in one sweep.
+
+    All `eli_order_id`s in `eli_kv_store` are polled concurrently under the
+    global Elitedias rate limit, then each G2G order whose Elitedias orders
+    all succeeded is delivered on G2G.
+
+    Returns:
+        bool: True when no G2G order is pending anymore.
+    """
+    pending_orders: dict[str, EliStoreModel] = eli_kv_store.get_many(
+        eli_kv_store.keys()
+    )
+    if not pending_orders:
+        return True
+
+    eli_order_ids = list(
+        {
+            eli_order_id
+            for mapped_order in pending_orders.values()
+            for eli_order_id in mapped_order.eli_order_ids
+        }
+    )
+    logger.info(
+        f"Tracking {len(eli_order_ids)} elitedias orders of {len(pending_orders)} G2G orders"
+    )
+
+    results = await asyncio.gather(
+        *(track_eli_order(eli_order_id) for eli_order_id in eli_order_ids),
+        return_exceptions=True,
+    )
+    successful_order_ids: set[str] = set()
+    for eli_order_id, result in zip(eli_order_ids, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Can not track elitedias order {eli_order_id}: {result}")
+        elif result:
+            successful_order_ids.add(eli_order_id)
+
+    for g2g_order_id, mapped_order in pending_orders.items():
         try:
-            logger.info(
-                f"Background task check lpk order status is running with tid: {tid}"
-            )
-            mapped_order: LpkStoreModel | None = kv_store.get(tid)
-            if mapped_order is None:
-                return
-            order_status_res = lpk_api_client.get_order_status(tid=tid)
-            if is_success_order(order_status_res):
-                g2g_api_client.patch_delivery_order(
-                    order_id=mapped_order.order_id,
-                    delivery_id=mapped_order.delivery_id,
-                    payload=PatchDeliveryPayload(
-                        delivered_qty=mapped_order.quantity,
-                        delivered_at=int(
-                            datetime.now().timestamp(),
-                        ),
-                    ),
-                )
-                LogToSheet.note_delivery(
-                    mapped_order.log_index,
-                    f"Delivery success for order id: {mapped_order.order_id}",
-                )
-
-                kv_store.delete(tid)
-                return
-
-            time.sleep(10 * 60)  # Sleep in 10 minutes
+            await deliver_eli_order(g2g_order_id, mapped_order, successful_order_ids)
         except Exception as e:
-            retry_time += 1
-            time.sleep(10 * 60)
             logger.exception(e)
 
-
-async def check_eli_order_status_cron_job(g2g_order_id: str) -> None:
-    async def __inner_function(g2g_order_id: str) -> None:
-        while True:
-            logger.info(
-                f"Background task to trach elitedias orders is running with G2G order id: {g2g_order_id}"
-            )
-            mapped_order: EliStoreModel | None = eli_kv_store.get(g2g_order_id)
-
-            if mapped_order is None:
-                return
-            successful_order_ids: list[str] = []
-            for eli_order_id in mapped_order.eli_order_ids:
-                track_order_res = await elitedias_api_client.track_order(eli_order_id)
-                logger.info(track_order_res)
-                if ELI_SUCCESS_KEY in track_order_res.order_status:
-                    successful_order_ids.append(eli_order_id)
-
-            for success_order_id in successful_order_ids:
-                if success_order_id in mapped_order.eli_order_ids:
-                    mapped_order.eli_order_ids.remove(success_order_id)
-                    eli_kv_store.set(g2g_order_id, mapped_order)
-
-            if len(mapped_order.eli_order_ids) == 0:
-                g2g_api_client.patch_delivery_order(
-                    order_id=g2g_order_id,
-                    delivery_id=mapped_order.delivery_id,
-                    payload=PatchDeliveryPayload(
-                        delivered_qty=mapped_order.quantity,
-                        delivered_at=int(
-                            datetime.now().timestamp(),
-                        ),
-                    ),
-                )
-                LogToSheet.note_delivery(
-                    mapped_order.log_index,
-                    f"Delivery success for order id: {g2g_order_id}",
-                )
-                eli_kv_store.delete(g2g_order_id)
-                return
-
-            await asyncio.sleep(2 * 60)  # Sleep for 2 minutes
-
-    await afunc_retry(__inner_function)(g2g_order_id)
+    return False
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+
+from app import config, logger
+
+from .models import G2GProductMapping
+from .utils import load_product_mapping_and_rates_from_sheet
+
+MappingSnapshot = tuple[G2GProductMapping, float, float]
+
+
+class ProductMappingCache:
+    """
+    Process-wide cache of the G2G product mapping and currency rates.
+
+    The snapshot is loaded once at startup, reloaded by a background task
+    every `refresh_interval` seconds and swapped in as a single reference,
+    so readers always see a complete mapping.
+    """
+
+    def __init__(
+        self,
+        sheet_id: str,
+        sheet_name: str,
+        start_row: int,
+        refresh_interval: float,
+    ) -> None:
+        self.sheet_id = sheet_id
+        self.sheet_name = sheet_name
+        self.start_row = start_row
+        self.refresh_interval = refresh_interval
+
+        self._snapshot: MappingSnapshot | None = None
+        self._load_lock = threading.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    def refresh(self) -> MappingSnapshot:
+        with self._load_lock:
+            snapshot = load_product_mapping_and_rates_from_sheet(
+                sheet_id=self.sheet_id,
+                sheet_name=self.sheet_name,
+                start_row=self.start_row,
+            )
+            self._snapshot = snapshot
+
+        logger.info(f"Product mapping cache refreshed: {len(snapshot[0])} products")
+        return snapshot
+
+    def get(self) -> MappingSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Cold cache (startup load failed): load on the request path
+            snapshot = self.refresh()
+
+        return snapshot
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.exception(e)
+                logger.info("Keep using the previous product mapping snapshot")
+
+    async def start(self) -> None:
+        try:
+            await asyncio.to_thread(self.refresh)
+        except Exception as e:
+            logger.exception(e)
+            logger.info("Initial product mapping load failed, will load on demand")
+
+        self._refresh_task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+
+product_mapping_cache = ProductMappingCache(
+    sheet_id=config.SHEET_ID,
+    sheet_name=config.MAPPING_SHEET_NAME,
+    start_row=2,
+    refresh_interval=config.MAPPING_CACHE_REFRESH_INTERVAL,
+)
@@ -21,3 +21,8 @@ class ProviderMode(Enum):
     LAPAKGAMING = "lapakgaming"
     ELITEDIAS = "elitedias"
     AUTO = "auto"
+
+
+class StatusCheckKind(Enum):
+    LAPAKGAMING = "lapakgaming"
+    ELITEDIAS = "elitedias"
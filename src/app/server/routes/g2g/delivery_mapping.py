@@ -0,0 +1,127 @@
+import json
+import os
+import pathlib
+import threading
+
+from typing import Final
+
+from app.paths import DATA_PATH
+
+from . import logger
+from .models import AttributeItem
+
+DEFAULT_KEY: Final[str] = "DEFAULT_KEY"
+
+# payload_key -> value mapping, None when the raw value is used
+DeliveryRule = tuple[str, dict[str, str] | None]
+
+
+class CompiledDeliveryMapping:
+    """
+    Delivery method list mapping of one product, indexed by
+    `attribute_group_id` so an order resolves with one lookup per item.
+
+    Mapping following rule: dict[<payload_key>, <attribute_group_id> |
+    dict[<attribute_group_id> | DEFAULT_KEY, dict[<G2G value>, <value>] | <default>]]
+    """
+
+    def __init__(self, product_mapping: dict) -> None:
+        self.defaults: dict[str, str] = {}
+        self.rules: dict[str, list[DeliveryRule]] = {}
+
+        for payload_key, map_attribute_group_id in product_mapping.items():
+            # This case handle for no need to mapping value
+            if isinstance(map_attribute_group_id, str):
+                self.rules.setdefault(map_attribute_group_id, []).append(
+                    (payload_key, None)
+                )
+            if isinstance(map_attribute_group_id, dict):
+                for attribute_group_id, value_mapping in map_attribute_group_id.items():
+                    if attribute_group_id == DEFAULT_KEY:
+                        self.defaults[payload_key] = value_mapping
+                    else:
+                        self.rules.setdefault(attribute_group_id, []).append(
+                            (payload_key, value_mapping)
+                        )
+
+    def resolve(self, delivery_method_list: list[AttributeItem]) -> dict:
+        """
+        Map the delivery method list of an order to provider payload fields.
+
+        Defaults are filled first, matching items override them and a later
+        item overrides an earlier one.
+        """
+        if not delivery_method_list:
+            return {}
+
+        mapping_payload: dict = dict(self.defaults)
+        for delivery_method in delivery_method_list:
+            for payload_key, value_mapping in self.rules.get(
+                delivery_method.attribute_group_id, ()
+            ):
+                if value_mapping is None:
+                    mapping_payload[payload_key] = (
+                        delivery_method.value or delivery_method.attribute_value
+                    )
+                elif delivery_method.value in value_mapping:
+                    mapping_payload[payload_key] = value_mapping[delivery_method.value]
+                elif delivery_method.attribute_value in value_mapping:
+                    mapping_payload[payload_key] = value_mapping[
+                        delivery_method.attribute_value
+                    ]
+
+        return mapping_payload
+
+
+class DeliveryMappingCache:
+    """
+    Compiled delivery method list mappings of a JSON file, keyed by G2G
+    product id. The file is recompiled only when its mtime changes, a file
+    that fails to load keeps the previous mappings in use.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+
+        self._mtime_ns: int | None = None
+        self._mappings: dict[str, CompiledDeliveryMapping] = {}
+        self._lock = threading.Lock()
+
+    def _compile(self) -> dict[str, CompiledDeliveryMapping]:
+        with open(self.path) as f:
+            raw_mappings: dict[str, dict] = json.load(f)
+
+        return {
+            product_id: CompiledDeliveryMapping(product_mapping)
+            for product_id, product_mapping in raw_mappings.items()
+        }
+
+    def get(self) -> dict[str, CompiledDeliveryMapping]:
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        if mtime_ns == self._mtime_ns:
+            return self._mappings
+
+        with self._lock:
+            if mtime_ns != self._mtime_ns:
+                try:
+                    self._mappings = self._compile()
+                except Exception as e:
+                    if self._mtime_ns is None:
+                        raise
+                    logger.exception(e)
+                    logger.info(f"Keep using the previous mappings of {self.path.name}")
+                else:
+                    logger.info(
+                        f"Compiled {len(self._mappings)} delivery mappings of {self.path.name}"
+                    )
+                self._mtime_ns = mtime_ns
+
+        return self._mappings
+
+
+lapak_delivery_mapping_cache = DeliveryMappingCache(
+    DATA_PATH / "lapak_delivery_method_list_mapping.json"
+)
+eli_delivery_mapping_cache = DeliveryMappingCache(
+    DATA_PATH / "eli_delivery_method_list_mapping.json"
+)
@@ -5,7 +5,13 @@ from fastapi import Depends, Header, HTTPException
 from app import config
 
 from . import logger
-from .utils import generate_signature
+from .utils import WebhookSignatureVerifier
+
+webhook_signature_verifier = WebhookSignatureVerifier(
+    webhook_url=config.G2G_WEBHOOK_URL,
+    user_id=config.G2G_ACCOUNT_ID,
+    secret_token=config.G2G_WEBHOOOK_SECRET_TOKEN,
+)
 
 
 def verify_signature(
@@ -15,14 +21,7 @@ def verify_signature(
     logger.info(g2g_signature)
     logger.info(g2g_timestamp)
 
-    signature = generate_signature(
-        config.G2G_WEBHOOK_URL,
-        user_id=config.G2G_ACCOUNT_ID,
-        timestamp=g2g_timestamp,
-        secret_token=config.G2G_WEBHOOOK_SECRET_TOKEN,
-    )
-
-    if signature != g2g_signature:
+    if not webhook_signature_verifier.verify(g2g_timestamp, g2g_signature):
         logger.error("Can't verify signature")
         raise HTTPException(status_code=401, detail="Can't verify signature")
 
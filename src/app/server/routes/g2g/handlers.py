@@ -1,98 +1,59 @@
-from typing import Final
-
-from fastapi import BackgroundTasks
-
 from .models import APIDeliveryPayload
 from .enums import DeliveryMethodCode
+from .delivery_mapping import (
+    CompiledDeliveryMapping,
+    lapak_delivery_mapping_cache,
+    eli_delivery_mapping_cache,
+)
 
 from . import logger
-from ...models import ProductMap, G2GProductMapping, ProviderMode
-from ...background_tasks import (
-    check_lpk_order_status_cron_job,
-    check_eli_order_status_cron_job,
-)
-from ...utils import load_product_mapping_and_rates_from_sheet
+from ...models import ProductMap, G2GProductMapping, ProviderMode, StatusCheckKind
+from ...scheduler import delivery_scheduler
+from ...mapping_cache import product_mapping_cache
 
-from app.g2g.api_client import g2g_api_client
+from app.g2g.api_client import async_g2g_api_client
 from app.g2g.models import GetOfferResponse
 from app.elite.api_client import elitedias_api_client
+from app.elite.utils import create_topups
 from app.lpk.api_client import lpk_api_client
 from app.lpk.utils import get_lowest_price_from_list_code
 from app.lpk.models import Product as LpkProduct
-from app.shared.utils import (
-    load_lapak_delivery_method_list_mapping,
-    load_eli_delivery_method_list_mapping,
-)
 from app.lpk.models import OrderPayload
 from app.shared.models import LpkStoreModel, EliStoreModel
 from app.sheet.models import LogToSheet
-from app.shared.utils import afunc_retry
-
-from app import kv_store, config, eli_kv_store
+from app.shared.enums import Upstream
+from app.shared.retry import async_retry
 
-DEFAULT_KEY: Final[str] = "DEFAULT_KEY"
+from app import kv_store, eli_kv_store
 
 
 async def api_delivery_hanlder(
     payload: APIDeliveryPayload,
-    background_tasks: BackgroundTasks,
 ):
     # Check if delivery method code is DIRECT TOP UP
     if (
         payload.delivery_summary.delivery_method_code
         is DeliveryMethodCode.DIRECT_TOP_UP
     ):
-        await handle_direct_topup_api_delivery(payload, background_tasks)
+        await handle_direct_topup_api_delivery(payload)
     return {"message": "ok"}
 
 
 def map_delivery_method_list(
     payload: APIDeliveryPayload,
-    product_delivery_method_list_mapping: dict,
+    product_delivery_method_list_mapping: CompiledDeliveryMapping,
 ) -> dict:
-    mapping_payload: dict = {}
-
-    for delivery_method_list in payload.delivery_summary.delivery_method_list:
-        for (
-            payload_key,
-            map_attribute_group_id,
-        ) in product_delivery_method_list_mapping.items():
-            # This case handle for no need to mapping value
-            if isinstance(map_attribute_group_id, str):
-                if delivery_method_list.attribute_group_id == map_attribute_group_id:
-                    if delivery_method_list.value:
-                        mapping_payload[payload_key] = delivery_method_list.value
-                    else:
-                        mapping_payload[payload_key] = (
-                            delivery_method_list.attribute_value
-                        )
-            if isinstance(map_attribute_group_id, dict):
-                for attribute_group_id, value_mapping in map_attribute_group_id.items():
-                    # This case handle for Default Key
-                    if DEFAULT_KEY == attribute_group_id:
-                        mapping_payload[payload_key] = value_mapping
-
-                    # This case handle for mapping value
-                    if delivery_method_list.attribute_group_id == attribute_group_id:
-                        if delivery_method_list.value in value_mapping:
-                            mapping_payload[payload_key] = value_mapping[
-                                delivery_method_list.value
-                            ]
-                        elif delivery_method_list.attribute_value in value_mapping:
-                            mapping_payload[payload_key] = value_mapping[
-                                delivery_method_list.attribute_value
-                            ]
-
-    return mapping_payload
+    return product_delivery_method_list_mapping.resolve(
+        payload.delivery_summary.delivery_method_list
+    )
 
 
 async def eli_delivery(
     payload: APIDeliveryPayload,
-    background_tasks: BackgroundTasks,
     offer: GetOfferResponse,
     product_map: ProductMap,
     SGD_to_USD_rate: float,
-    eli_delivery_method_list_mapping: dict,
+    eli_delivery_method_list_mapping: dict[str, CompiledDeliveryMapping],
     log_to_sheet: LogToSheet,
 ):
     logger.info("Delivery with Elitedias")
@@ -121,7 +82,9 @@ async def eli_delivery(
     )
     elite_unit_price: float | None = None
     try:
-        elite_unit_price = await afunc_retry(elitedias_api_client.get_price)(
+        elite_unit_price = await async_retry(Upstream.ELITEDIAS, base_delay=1)(
+            elitedias_api_client.get_price
+        )(
             game=product_map["elitedias"]["game"],
             denom=product_map["elitedias"]["denom"],
         )
@@ -166,54 +129,40 @@ async def eli_delivery(
     logger.info(f"Updated elitedias topup payload: {eli_topup_payload}")
     log_to_sheet.append_note(f"Order payload: {eli_topup_payload}")
 
-    eli_order_ids: list[str] = []
-
-    failed_reason: str | None = None
-    # Create offer to Elitedias
-    retry_time: int = 0
-    while (
-        len(eli_order_ids) < payload.purchased_qty
-        and retry_time < 2 + payload.purchased_qty
-    ):
-        try:
-            create_topup_res = await afunc_retry(
-                elitedias_api_client.create_topup, sleep_interval=5
-            )(eli_topup_payload)
-
-            if create_topup_res.order_id is None or (
-                create_topup_res.status and "success" not in create_topup_res.status
-            ):
-                logger.info(
-                    f"Failed to create Elitedias. Reason: {create_topup_res.message}"
-                )
-                failed_reason = create_topup_res.message
-
-            else:
-                eli_order_ids.append(create_topup_res.order_id)
-        except Exception as e:
-            logger.exception(e)
-
-        retry_time += 1
+    # Create orders to Elitedias, one top-up per purchased unit
+    eli_order_ids, failed_reason = await create_topups(
+        eli_topup_payload, quantity=payload.purchased_qty
+    )
 
-    if len(eli_order_ids) == payload.purchased_qty:
+    if eli_order_ids:
+        # Track what was created, even when only part of the quantity succeeded
         eli_kv_store.set(
             key=payload.order_id,
             value=EliStoreModel(
                 g2g_order_id=payload.order_id,
                 eli_order_ids=eli_order_ids,
                 delivery_id=payload.delivery_summary.delivery_id,
-                quantity=payload.purchased_qty,
+                quantity=len(eli_order_ids),
                 log_index=log_to_sheet.index,
             ),
         )
-        background_tasks.add_task(check_eli_order_status_cron_job, payload.order_id)
+        delivery_scheduler.schedule_eli_tracker()
         log_to_sheet.provider_order_ids = "\n".join(eli_order_ids)
+
+    if len(eli_order_ids) == payload.purchased_qty:
         logger.info(
             f"Successfully create order to Elitedias with G2G order id: {payload.order_id}"
         )
         log_to_sheet.append_note(
             f"Successfully create order to Elitedias with G2G order id: {payload.order_id}"
         )
+    elif eli_order_ids:
+        logger.info(
+            f"PARTIAL create order to Elitedias with G2G order id: {payload.order_id}"
+        )
+        log_to_sheet.append_note(
+            f"PARTIAL create order to Elitedias with G2G order id: {payload.order_id}. Created {len(eli_order_ids)}/{payload.purchased_qty}. Failed reason: {failed_reason}"
+        )
     else:
         logger.info(
             f"FAILED create order to Elitedias with G2G order id: {payload.order_id}"
@@ -228,11 +177,10 @@ async def eli_delivery(
 
 def lapak_delivery(
     payload: APIDeliveryPayload,
-    background_tasks: BackgroundTasks,
     offer: GetOfferResponse,
     product_map: ProductMap,
     IDR_to_USD_rate: float,
-    lapak_delivery_method_list_mapping: dict,
+    lapak_delivery_method_list_mapping: dict[str, CompiledDeliveryMapping],
     log_to_sheet: LogToSheet,
     min_price_product: LpkProduct | None = None,
 ):
@@ -302,8 +250,8 @@ def lapak_delivery(
                 log_index=log_to_sheet.index,
             ),
         )
-        background_tasks.add_task(
-            check_lpk_order_status_cron_job,
+        delivery_scheduler.schedule(
+            StatusCheckKind.LAPAKGAMING,
             lpk_create_order_res.data.tid,
         )
         log_to_sheet.provider_order_ids = lpk_create_order_res.data.tid
@@ -339,7 +287,6 @@ def find_product_map(
 
 async def handle_direct_topup_api_delivery(
     payload: APIDeliveryPayload,
-    background_tasks: BackgroundTasks,
 ):
     logger.info(f"Handling Direct top up for order ID: {payload.order_id}")
     log_to_sheet = LogToSheet.register_note_row()
@@ -348,27 +295,21 @@ async def handle_direct_topup_api_delivery(
 
     # Load product mapppings and curency exchange rate
     logger.info("Loading product mapppings and curency exchange rate")
-    product_mapping, IDR_to_USD_rate, SGD_to_USD_rate = (
-        load_product_mapping_and_rates_from_sheet(
-            sheet_id=config.SHEET_ID,
-            sheet_name=config.MAPPING_SHEET_NAME,
-            start_row=2,
-        )
-    )
+    product_mapping, IDR_to_USD_rate, SGD_to_USD_rate = product_mapping_cache.get()
 
     log_to_sheet.append_note(
         f"IDR -> USE rate: {IDR_to_USD_rate:.10f} | SGD -> USD rate: {SGD_to_USD_rate}"
     )
 
     # Load delivery method list mapping for Lapakgaming
-    lapak_delivery_method_list_mapping = load_lapak_delivery_method_list_mapping()
+    lapak_delivery_method_list_mapping = lapak_delivery_mapping_cache.get()
 
     # Load delivery method list mapping for Elitedias
-    eli_delivery_method_list_mapping = load_eli_delivery_method_list_mapping()
+    eli_delivery_method_list_mapping = eli_delivery_mapping_cache.get()
 
     # Get offer by offer id
     logger.info(f"Getting offer in for with offer ID: {payload.offer_id}")
-    offer = g2g_api_client.get_offer(payload.offer_id).payload
+    offer = (await async_g2g_api_client.get_cached_offer(payload.offer_id)).payload
     logger.info(f"Offer Title: {offer.title}")
     log_to_sheet.g2g_product_id = offer.product_id
 
@@ -389,7 +330,6 @@ async def handle_direct_topup_api_delivery(
     if product_map["provider_mode"] == ProviderMode.ELITEDIAS.value:
         await eli_delivery(
             payload,
-            background_tasks,
             offer,
             product_map,
             SGD_to_USD_rate,
@@ -399,7 +339,6 @@ async def handle_direct_topup_api_delivery(
     elif product_map["provider_mode"] == ProviderMode.LAPAKGAMING.value:
         lapak_delivery(
             payload,
-            background_tasks,
             offer,
             product_map,
             IDR_to_USD_rate,
@@ -415,7 +354,6 @@ async def handle_direct_topup_api_delivery(
         ):
             lapak_delivery(
                 payload,
-                background_tasks,
                 offer,
                 product_map,
                 IDR_to_USD_rate,
@@ -426,7 +364,6 @@ async def handle_direct_topup_api_delivery(
         elif not product_map["lapakgaming"]:
             await eli_delivery(
                 payload,
-                background_tasks,
                 offer,
                 product_map,
                 SGD_to_USD_rate,
@@ -446,7 +383,6 @@ async def handle_direct_topup_api_delivery(
             if not min_lpk_product:
                 await eli_delivery(
                     payload,
-                    background_tasks,
                     offer,
                     product_map,
                     SGD_to_USD_rate,
@@ -467,7 +403,6 @@ async def handle_direct_topup_api_delivery(
                 if min_lpk_usd_price < eli_usd_price:
                     lapak_delivery(
                         payload,
-                        background_tasks,
                         offer,
                         product_map,
                         IDR_to_USD_rate,
@@ -478,7 +413,6 @@ async def handle_direct_topup_api_delivery(
                 else:
                     await eli_delivery(
                         payload,
-                        background_tasks,
                         offer,
                         product_map,
                         SGD_to_USD_rate,
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, BackgroundTasks
+from fastapi import APIRouter
 
 
 from . import logger
@@ -22,12 +22,11 @@ async def hello_from_g2g() -> str:
 async def webhook(
     order_event: OrderEvent,
     _: VerifySignatureDep,
-    background_tasks: BackgroundTasks,
 ):
     match order_event.event_type:
         case OrderEventType.ORDER_API_DELIVERY:
             logger.info(order_event)
             payload = APIDeliveryPayload.model_validate(order_event.payload)
-            return await api_delivery_hanlder(payload, background_tasks)
+            return await api_delivery_hanlder(payload)
         case _:
             return
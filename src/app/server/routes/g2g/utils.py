@@ -2,28 +2,25 @@ import hashlib
 import hmac
 
 
-def generate_signature(
-    webhook_url: str,
-    user_id: str,
-    timestamp: str,
-    secret_token: str,
-) -> str:
+class WebhookSignatureVerifier:
+    """
+    Verifies webhook signatures against a HMAC keyed once with the secret
+    token, signatures are compared in constant time.
     """
-    Generate HMAC-SHA256 signature for webhook authentication.
 
-    Args:
-        webhook_url (str): The URL of the webhook.
-        user_id (str): The user ID.
-        timestamp (str): Timestamp string, usually in milliseconds.
-        secret_token (str): The webhook secret token.
+    def __init__(self, webhook_url: str, user_id: str, secret_token: str) -> None:
+        self.canonical_prefix = f"{webhook_url}{user_id}"
+        self.base_hmac = hmac.new(
+            key=secret_token.encode("utf-8"),
+            digestmod=hashlib.sha256,
+        )
 
-    Returns:
-        str: Hexadecimal HMAC signature.
-    """
-    canonical_string = f"{webhook_url}{user_id}{timestamp}"
-    signature = hmac.new(
-        key=secret_token.encode("utf-8"),
-        msg=canonical_string.encode("utf-8"),
-        digestmod=hashlib.sha256,
-    ).hexdigest()
-    return signature
+    def sign(self, timestamp: str) -> str:
+        signature_hmac = self.base_hmac.copy()
+        signature_hmac.update(f"{self.canonical_prefix}{timestamp}".encode("utf-8"))
+        return signature_hmac.hexdigest()
+
+    def verify(self, timestamp: str, signature: str) -> bool:
+        return hmac.compare_digest(
+            self.sign(timestamp).encode("utf-8"), signature.encode("utf-8")
+        )
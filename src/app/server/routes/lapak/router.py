@@ -1,16 +1,17 @@
 from datetime import datetime
 
-from fastapi import APIRouter, BackgroundTasks
+from fastapi import APIRouter
 
 from .models import ProductCallbackPayload, OrderCallbackPayload
 from . import logger
 from .utiles import is_success_order
-from ...background_tasks import check_lpk_order_status_cron_job
+from ...models import StatusCheckKind
+from ...scheduler import delivery_scheduler
 
 from app import kv_store
 from app.shared.models import LpkStoreModel
 from app.g2g.models import PatchDeliveryPayload
-from app.g2g.api_client import g2g_api_client
+from app.g2g.api_client import async_g2g_api_client
 from app.sheet.models import LogToSheet
 
 router = APIRouter(
@@ -30,9 +31,7 @@ async def product_callback(payload: ProductCallbackPayload) -> dict:
 
 
 @router.post("/order")
-async def order_callback(
-    payload: OrderCallbackPayload, background_tasks: BackgroundTasks
-) -> dict:
+async def order_callback(payload: OrderCallbackPayload) -> dict:
     tid = payload.data.tid
     mapped_order: LpkStoreModel | None = kv_store.get(tid)
     if mapped_order is None:
@@ -40,7 +39,7 @@ async def order_callback(
             "message": "SUCCESS",
         }
     if is_success_order(payload):
-        g2g_api_client.patch_delivery_order(
+        await async_g2g_api_client.patch_delivery_order(
             order_id=mapped_order.order_id,
             delivery_id=mapped_order.delivery_id,
             payload=PatchDeliveryPayload(
@@ -56,7 +55,7 @@ async def order_callback(
         )
         kv_store.delete(tid)
     else:
-        background_tasks.add_task(check_lpk_order_status_cron_job, tid)
+        delivery_scheduler.schedule(StatusCheckKind.LAPAKGAMING, tid)
 
     return {
         "message": "SUCCESS",
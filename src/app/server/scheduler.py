@@ -0,0 +1,155 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+from typing import Awaitable, Callable
+
+from app import config, logger, kv_store, eli_kv_store
+from app.shared.enums import RequestPriority
+from app.sheet.rate_limit import sheets_priority
+
+from .models import StatusCheckKind
+from .background_tasks import (
+    ELI_TRACKER_KEY,
+    check_lpk_order_status,
+    track_pending_eli_orders,
+)
+
+CHECKERS: dict[StatusCheckKind, Callable[[str], Awaitable[bool]]] = {
+    StatusCheckKind.LAPAKGAMING: check_lpk_order_status,
+    # Elitedias orders are tracked together by one recurring sweep
+    StatusCheckKind.ELITEDIAS: track_pending_eli_orders,
+}
+
+CHECK_INTERVALS: dict[StatusCheckKind, float] = {
+    StatusCheckKind.LAPAKGAMING: config.LPK_STATUS_CHECK_INTERVAL,
+    StatusCheckKind.ELITEDIAS: config.ELI_STATUS_CHECK_INTERVAL,
+}
+
+
+class DeliveryScheduler:
+    """
+    Single task that runs provider status checks for pending deliveries.
+
+    Due checks live in a heap ordered by due time. Whenever the head is due,
+    every check due at that moment is popped and started as its own task, so
+    a slow check never delays others. A check is rescheduled after its
+    provider interval until the order is delivered or has failed
+    `max_failures` times in a row. The queue is rebuilt from the order stores
+    at startup, so a restart loses no pending work.
+    """
+
+    def __init__(self, max_failures: int) -> None:
+        self.max_failures = max_failures
+
+        self._queue: list[tuple[float, int, StatusCheckKind, str]] = []
+        self._scheduled: set[tuple[StatusCheckKind, str]] = set()
+        self._failures: dict[tuple[StatusCheckKind, str], int] = {}
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        # Checks in flight, at most one per (kind, key)
+        self._running: dict[tuple[StatusCheckKind, str], asyncio.Task] = {}
+        # Checks that came due again while in flight
+        self._rerun: set[tuple[StatusCheckKind, str]] = set()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def schedule(self, kind: StatusCheckKind, key: str, delay: float = 0) -> None:
+        if (kind, key) in self._scheduled:
+            return
+
+        due_at = time.monotonic() + delay
+        is_new_head = not self._queue or due_at < self._queue[0][0]
+        heapq.heappush(self._queue, (due_at, next(self._sequence), kind, key))
+        self._scheduled.add((kind, key))
+
+        if is_new_head:
+            self._wakeup.set()
+
+    def schedule_eli_tracker(self) -> None:
+        self.schedule(StatusCheckKind.ELITEDIAS, ELI_TRACKER_KEY)
+
+    def rebuild(self) -> None:
+        for tid in kv_store.keys():
+            self.schedule(StatusCheckKind.LAPAKGAMING, tid)
+        if eli_kv_store.keys():
+            self.schedule_eli_tracker()
+
+        logger.info(f"Delivery scheduler rebuilt with {len(self)} pending checks")
+
+    def pop_due(self) -> list[tuple[StatusCheckKind, str]]:
+        now = time.monotonic()
+        due: list[tuple[StatusCheckKind, str]] = []
+        while self._queue and self._queue[0][0] <= now:
+            _, _, kind, key = heapq.heappop(self._queue)
+            self._scheduled.discard((kind, key))
+            due.append((kind, key))
+        return due
+
+    async def run_check(self, kind: StatusCheckKind, key: str) -> None:
+        try:
+            is_done = await CHECKERS[kind](key)
+            self._failures.pop((kind, key), None)
+        except Exception as e:
+            logger.exception(e)
+            failures = self._failures.get((kind, key), 0) + 1
+            if failures > self.max_failures:
+                logger.info(f"Give up {kind.value} status check for: {key}")
+                self._failures.pop((kind, key), None)
+                return
+            self._failures[(kind, key)] = failures
+            is_done = False
+
+        if not is_done:
+            self.schedule(kind, key, delay=CHECK_INTERVALS[kind])
+
+    def start_check(self, kind: StatusCheckKind, key: str) -> None:
+        if (kind, key) in self._running:
+            self._rerun.add((kind, key))
+            return
+
+        task = asyncio.create_task(self.run_check(kind, key))
+        self._running[(kind, key)] = task
+        task.add_done_callback(lambda _: self._on_check_done(kind, key))
+
+    def _on_check_done(self, kind: StatusCheckKind, key: str) -> None:
+        self._running.pop((kind, key), None)
+        if (kind, key) in self._rerun:
+            self._rerun.discard((kind, key))
+            self.schedule(kind, key)
+
+    async def run(self) -> None:
+        # Deliveries log to sheets ahead of background refreshes
+        sheets_priority.set(RequestPriority.ORDER)
+        while True:
+            for kind, key in self.pop_due():
+                self.start_check(kind, key)
+
+            timeout = self._queue[0][0] - time.monotonic() if self._queue else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        self.rebuild()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        tasks = list(self._running.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._running.clear()
+        self._rerun.clear()
+
+
+delivery_scheduler = DeliveryScheduler(max_failures=config.STATUS_CHECK_MAX_FAILURES)
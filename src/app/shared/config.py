@@ -4,6 +4,8 @@ from dotenv import load_dotenv
 
 from pydantic import BaseModel
 
+from .enums import StoreBackend
+
 
 class Config(BaseModel):
     APP_TITLE: str
@@ -17,10 +19,21 @@ class Config(BaseModel):
     MAPPING_SHEET_NAME: str
     IDR_TO_USD_RATE_CELL: str = "T2"
     SGD_TO_USD_RATE_CELL: str = "U2"
+    MAPPING_CACHE_REFRESH_INTERVAL: int = 5 * 60  # seconds
+    SHEET_WORKSHEET_CACHE_TTL: int = 10 * 60  # seconds
+    # Sheets API requests per second, per-minute quota / 60
+    SHEETS_READ_RATE_LIMIT: float = 1
+    SHEETS_WRITE_RATE_LIMIT: float = 1
+    SHEETS_RATE_LIMIT_BURST: float = 10
+    # Share of the budget for BULK requests of the sync scripts, which run in
+    # their own process and would otherwise take all of it from the server
+    SHEETS_BULK_READ_RATE_LIMIT: float = 0.5
+    SHEETS_BULK_WRITE_RATE_LIMIT: float = 0.5
 
     # Log sheets
     LOG_SHEET_ID: str
     LOG_SHEET_NAME: str
+    LOG_SHEET_FLUSH_INTERVAL: float = 5  # seconds
 
     # G2G KEYS
     G2G_ACCOUNT_ID: str
@@ -28,15 +41,35 @@ class Config(BaseModel):
     G2G_SECRET_KEY: str
     G2G_WEBHOOOK_SECRET_TOKEN: str
     G2G_WEBHOOK_URL: str
+    G2G_CRAWLER_CONCURRENCY: int = 8
+    G2G_CRAWLER_RATE_LIMIT: float = 5  # requests per second per endpoint
+    OFFER_CACHE_TTL: int = 5 * 60  # seconds
+    OFFER_CACHE_MAX_SIZE: int = 1000
 
     # Lapak API key
     LAPAK_API_KEY: str
+    LPK_CATALOG_TTL: int = 10 * 60  # seconds
 
     # Plsbuy credentials
     ALITEDIAS_API_KEY: str
+    ELITEDIAS_TOPUP_CONCURRENCY: int = 5
+    ELITEDIAS_TOPUP_MAX_ROUNDS: int = 3
+    ELITEDIAS_TRACK_RATE_LIMIT: float = 5  # track_order calls per second
 
     ORIGIN: str = "sosanhsach.io"
 
+    # Order mapping stores
+    KV_STORE_BACKEND: StoreBackend = StoreBackend.JSON
+
+    # Delivery status checks (seconds)
+    LPK_STATUS_CHECK_INTERVAL: int = 10 * 60
+    ELI_STATUS_CHECK_INTERVAL: int = 2 * 60
+    STATUS_CHECK_MAX_FAILURES: int = 3
+
+    # Retries of upstream calls
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RESET_TIMEOUT: float = 30  # seconds
+
     @staticmethod
     def from_env(dotenv_path: str = "settings.env") -> "Config":
         load_dotenv(dotenv_path)
@@ -0,0 +1,27 @@
+from enum import Enum
+
+
+class StoreBackend(Enum):
+    JSON = "json"
+    LOG = "log"
+    SQLITE = "sqlite"
+
+
+class Upstream(Enum):
+    SHEETS = "sheets"
+    G2G = "g2g"
+    LAPAK = "lapak"
+    ELITEDIAS = "elitedias"
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class RequestPriority(Enum):
+    # Lower values are served first
+    ORDER = 0
+    DEFAULT = 1
+    BULK = 2
@@ -0,0 +1,97 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket for asyncio code: `rate` tokens per second, bursts up to
+    `capacity`. Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1) -> None:
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+class PriorityTokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts up to
+    `capacity`. Waiters are served by ascending `priority`, then in arrival
+    order.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._cond = threading.Condition()
+        # Heap of (priority, arrival) of the waiting callers
+        self._waiters: list[tuple[int, int]] = []
+        self._arrivals = itertools.count()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def acquire(self, priority: int = 0, tokens: float = 1) -> None:
+        with self._cond:
+            ticket = (priority, next(self._arrivals))
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    self._refill()
+                    if self._waiters[0] != ticket:
+                        # Woken up when the head of the queue is served
+                        self._cond.wait()
+                        continue
+
+                    if self._tokens >= tokens:
+                        heapq.heappop(self._waiters)
+                        self._tokens -= tokens
+                        self._cond.notify_all()
+                        return
+
+                    self._cond.wait((tokens - self._tokens) / self.rate)
+            except BaseException:
+                if ticket in self._waiters:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                raise
+
+    def queue_depth(self) -> dict[int, int]:
+        """
+        Number of waiting callers by priority.
+        """
+        with self._cond:
+            depth: dict[int, int] = {}
+            for priority, _ in self._waiters:
+                depth[priority] = depth.get(priority, 0) + 1
+            return depth
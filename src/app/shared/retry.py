@@ -0,0 +1,365 @@
+import asyncio
+import random
+import threading
+import time
+
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Any, Awaitable, Callable, Final, ParamSpec, TypeVar
+
+import httpx
+import requests
+
+from pydantic import BaseModel, ConfigDict
+
+from app import config, logger
+
+from .enums import Upstream, CircuitState
+
+T_Rt = TypeVar("T_Rt")
+T_Pr = ParamSpec("T_Pr")
+
+RETRYABLE_STATUS_CODES: Final[frozenset[int]] = frozenset(
+    {408, 425, 429, 500, 502, 503, 504}
+)
+NETWORK_ERRORS: Final[tuple[type[BaseException], ...]] = (
+    httpx.TransportError,
+    requests.ConnectionError,
+    requests.Timeout,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, upstream: Upstream) -> None:
+        super().__init__(f"Circuit of {upstream.value} is open")
+        self.upstream = upstream
+
+
+class RetryPolicy(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    max_retries: int = 3
+    base_delay: float = 0.5  # seconds
+    max_delay: float = 60  # seconds
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Exponential backoff with equal jitter for the 0-based `attempt`.
+        """
+        delay = min(self.max_delay, self.base_delay * 2**attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+def get_status_code(exc: BaseException) -> int | None:
+    # G2GAPIError, httpx.HTTPStatusError and gspread's APIError
+    status_code = getattr(exc, "status_code", None)
+    if status_code is None:
+        response = getattr(exc, "response", None)
+        status_code = getattr(response, "status_code", None)
+
+    return status_code if isinstance(status_code, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, CircuitOpenError):
+        return False
+
+    status_code = get_status_code(exc)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+
+    return isinstance(exc, NETWORK_ERRORS)
+
+
+def get_retry_after(exc: BaseException) -> float | None:
+    """
+    Seconds to wait from the `Retry-After` of the failed response, if any.
+    """
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+        retry_after = headers.get("Retry-After") if headers else None
+
+    if retry_after is None:
+        return None
+
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(str(retry_after))
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitBreaker:
+    """
+    Fails calls to an upstream fast after `failure_threshold` consecutive
+    retryable failures. After `reset_timeout` seconds one trial call is let
+    through, its outcome closes or reopens the circuit.
+    """
+
+    def __init__(
+        self,
+        upstream: Upstream,
+        failure_threshold: int,
+        reset_timeout: float,
+    ) -> None:
+        self.upstream = upstream
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CircuitState.CLOSED:
+                return True
+
+            if (
+                self.state == CircuitState.OPEN
+                and time.monotonic() - self._opened_at >= self.reset_timeout
+            ):
+                self.state = CircuitState.HALF_OPEN
+                return True
+
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CircuitState.CLOSED
+            self.failures = 0
+
+    def record_abort(self) -> None:
+        """
+        The call ended without an outcome (cancelled), a trial call is given
+        back so another one is let through after `reset_timeout`.
+        """
+        with self._lock:
+            if self.state == CircuitState.HALF_OPEN:
+                self.state = CircuitState.OPEN
+                self._opened_at = time.monotonic()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if (
+                self.state == CircuitState.HALF_OPEN
+                or self.failures >= self.failure_threshold
+            ):
+                if self.state != CircuitState.OPEN:
+                    logger.error(f"Circuit of {self.upstream.value} opened")
+                self.state = CircuitState.OPEN
+                self._opened_at = time.monotonic()
+
+
+class RetryMetrics:
+    """
+    Per-attempt counters keyed by upstream, operation and outcome.
+    """
+
+    def __init__(self) -> None:
+        self.counters: Counter[tuple[str, str, str]] = Counter()
+        self.backoff_seconds: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, upstream: Upstream, operation: str, outcome: str) -> None:
+        with self._lock:
+            self.counters[(upstream.value, operation, outcome)] += 1
+
+    def record_backoff(self, upstream: Upstream, delay: float) -> None:
+        with self._lock:
+            self.backoff_seconds[upstream.value] += delay
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            attempts: dict[str, dict[str, dict[str, int]]] = {}
+            for (upstream, operation, outcome), count in self.counters.items():
+                attempts.setdefault(upstream, {}).setdefault(operation, {})[outcome] = (
+                    count
+                )
+
+            return {
+                "attempts": attempts,
+                "backoff_seconds": dict(self.backoff_seconds),
+            }
+
+
+circuit_breakers: dict[Upstream, CircuitBreaker] = {
+    upstream: CircuitBreaker(
+        upstream,
+        failure_threshold=config.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=config.CIRCUIT_BREAKER_RESET_TIMEOUT,
+    )
+    for upstream in Upstream
+}
+retry_metrics = RetryMetrics()
+
+
+class RetryState:
+    """
+    Bookkeeping of one call: circuit checks, metrics and the next delay.
+    """
+
+    def __init__(self, upstream: Upstream, operation: str, policy: RetryPolicy):
+        self.upstream = upstream
+        self.operation = operation
+        self.policy = policy
+        self.breaker = circuit_breakers[upstream]
+
+    def before_attempt(self) -> None:
+        if not self.breaker.allow():
+            retry_metrics.record(self.upstream, self.operation, "rejected")
+            raise CircuitOpenError(self.upstream)
+
+    def on_success(self) -> None:
+        self.breaker.record_success()
+        retry_metrics.record(self.upstream, self.operation, "success")
+
+    def on_abort(self) -> None:
+        self.breaker.record_abort()
+        retry_metrics.record(self.upstream, self.operation, "aborted")
+
+    def on_failure(self, exc: Exception, attempt: int) -> float | None:
+        """
+        Returns:
+            float | None: Seconds to wait before the next attempt, None when
+            `exc` must be raised.
+        """
+        retryable = is_retryable(exc)
+        if retryable:
+            self.breaker.record_failure()
+        else:
+            # The upstream answered, the request itself was wrong
+            self.breaker.record_success()
+
+        if not retryable or attempt >= self.policy.max_retries:
+            retry_metrics.record(self.upstream, self.operation, "failure")
+            return None
+
+        delay = self.policy.backoff(attempt)
+        retry_after = get_retry_after(exc)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        retry_metrics.record(self.upstream, self.operation, "retry")
+        retry_metrics.record_backoff(self.upstream, delay)
+        logger.info(
+            f"Retry: {self.operation}, {attempt + 1} times in {delay:.1f}s, failed reason: {exc}"
+        )
+        return delay
+
+
+def retry(
+    upstream: Upstream,
+    max_retries: int = 3,
+    base_delay: float = 0.5,
+    max_delay: float = 60,
+):
+    """
+    Retry a function on retryable errors of `upstream`.
+
+    Args:
+        upstream: Service called by the function, selects the circuit breaker.
+        max_retries: Retries after the first attempt.
+        base_delay: Backoff of the first retry in seconds, doubled every retry.
+        max_delay: Upper bound of the backoff, `Retry-After` can exceed it.
+    """
+    policy = RetryPolicy(
+        max_retries=max_retries, base_delay=base_delay, max_delay=max_delay
+    )
+
+    def wrapper(func: Callable[T_Pr, T_Rt]) -> Callable[T_Pr, T_Rt]:
+        @wraps(func)
+        def inner(*args: T_Pr.args, **kwargs: T_Pr.kwargs) -> T_Rt:
+            state = RetryState(upstream, func.__qualname__, policy)
+            attempt = 0
+            while True:
+                state.before_attempt()
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    delay = state.on_failure(e, attempt)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                except BaseException:
+                    state.on_abort()
+                    raise
+
+                state.on_success()
+                return result
+
+        return inner
+
+    return wrapper
+
+
+def async_retry(
+    upstream: Upstream,
+    max_retries: int = 3,
+    base_delay: float = 0.5,
+    max_delay: float = 60,
+):
+    """
+    Asyncio variant of `retry`, backs off without blocking the event loop.
+    """
+    policy = RetryPolicy(
+        max_retries=max_retries, base_delay=base_delay, max_delay=max_delay
+    )
+
+    def wrapper(
+        afunc: Callable[T_Pr, Awaitable[T_Rt]],
+    ) -> Callable[T_Pr, Awaitable[T_Rt]]:
+        @wraps(afunc)
+        async def inner(*args: T_Pr.args, **kwargs: T_Pr.kwargs) -> T_Rt:
+            state = RetryState(upstream, afunc.__qualname__, policy)
+            attempt = 0
+            while True:
+                state.before_attempt()
+                try:
+                    result = await afunc(*args, **kwargs)
+                except Exception as e:
+                    delay = state.on_failure(e, attempt)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                except BaseException:
+                    # Cancelled: never leave the circuit half-open for good
+                    state.on_abort()
+                    raise
+
+                state.on_success()
+                return result
+
+        return inner
+
+    return wrapper
+
+
+def get_retry_metrics() -> dict[str, Any]:
+    return {
+        **retry_metrics.snapshot(),
+        "circuits": {
+            upstream.value: {
+                "state": breaker.state.value,
+                "failures": breaker.failures,
+            }
+            for upstream, breaker in circuit_breakers.items()
+        },
+    }
@@ -1,14 +1,62 @@
 import json
+import os
 import pathlib
+import sqlite3
+import threading
 
+from abc import ABC, abstractmethod
 from typing import TypeVar, Type, Generic
 
 from pydantic import BaseModel
 
+from .enums import StoreBackend
+
 T = TypeVar("T", bound=BaseModel)
 
 
-class KeyValueStore:
+class BaseKeyValueStore(ABC):
+    @abstractmethod
+    def get(self, key: str) -> str | None: ...
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None: ...
+
+    def update(self, key: str, value: str) -> None:
+        self.set(key, value)
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def keys(self) -> list[str]: ...
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        values: dict[str, str] = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def set_many(self, items: dict[str, str]) -> None:
+        for key, value in items.items():
+            self.set(key, value)
+
+    def delete_many(self, keys: list[str]) -> None:
+        """
+        Delete all `keys` or none of them.
+
+        Raises:
+            KeyError: Any of `keys` is missing.
+        """
+        missing = [key for key in keys if self.get(key) is None]
+        if missing:
+            raise KeyError(*missing)
+        for key in keys:
+            self.delete(key)
+
+
+class KeyValueStore(BaseKeyValueStore):
     def __init__(self, name: str, save_dir: pathlib.Path) -> None:
         self.name: str = name
         self.save_dir: pathlib.Path = save_dir
@@ -28,8 +76,12 @@ class KeyValueStore:
             self.data = json.load(f)
 
     def write_data(self) -> None:
-        with open(self.get_save_file(), "w") as f:
+        # Write to a temp file first, a crash mid-write keeps the old file
+        save_file = self.get_save_file()
+        tmp_file = save_file.with_suffix(".json.tmp")
+        with open(tmp_file, "w") as f:
             json.dump(self.data, f)
+        os.replace(tmp_file, save_file)
 
     def get(self, key: str) -> str | None:
         self.load_data()
@@ -39,15 +91,319 @@ class KeyValueStore:
         self.data[key] = value
         self.write_data()
 
-    def update(self, key: str, value: str) -> None:
-        self.set(key, value)
-
     def delete(self, key: str) -> None:
         del self.data[key]
         self.write_data()
 
+    def keys(self) -> list[str]:
+        self.load_data()
+        return list(self.data)
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        self.load_data()
+        return {key: self.data[key] for key in keys if key in self.data}
+
+    def set_many(self, items: dict[str, str]) -> None:
+        self.data.update(items)
+        self.write_data()
+
+    def delete_many(self, keys: list[str]) -> None:
+        missing = [key for key in keys if key not in self.data]
+        if missing:
+            raise KeyError(*missing)
+        for key in keys:
+            self.data.pop(key, None)
+        self.write_data()
+
+
+class LogKeyValueStore(BaseKeyValueStore):
+    """
+    Append-only key value store.
+
+    Every `set`/`delete` appends one JSON line to `<name>.log` and fsyncs it
+    (batch operations append all their lines with one fsync),
+    reads are served from an in-memory index. The log is compacted (rewritten
+    with live keys only, then atomically swapped in) once it holds more than
+    `compact_ratio` times as many records as live keys. A torn record left by
+    a crash mid-write is dropped on the next load.
+
+    Single-process only, use `SQLiteKeyValueStore` for several workers.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        save_dir: pathlib.Path,
+        compact_ratio: float = 2,
+        compact_min_records: int = 1000,
+    ) -> None:
+        self.name: str = name
+        self.save_dir: pathlib.Path = save_dir
+        self.compact_ratio = compact_ratio
+        self.compact_min_records = compact_min_records
+
+        self.data: dict[str, str] = {}
+        self.record_count: int = 0
+        self._lock = threading.Lock()
+
+        save_file = self.get_save_file()
+        if save_file.exists():
+            self.load_data()
+        else:
+            # Carry over entries written by the JSON store
+            legacy_file = self.save_dir / f"{self.name}.json"
+            if legacy_file.exists():
+                with open(legacy_file) as f:
+                    self.data = json.load(f)
+            self.write_snapshot()
+
+        self._log_file = open(save_file, "a", encoding="utf-8")
+
+    def get_save_file(self) -> pathlib.Path:
+        return self.save_dir / f"{self.name}.log"
+
+    def load_data(self) -> None:
+        save_file = self.get_save_file()
+        valid_size = 0
+        with open(save_file, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+
+                if "v" in record:
+                    self.data[record["k"]] = record["v"]
+                else:
+                    self.data.pop(record["k"], None)
+                self.record_count += 1
+                valid_size += len(line)
+
+        if valid_size < save_file.stat().st_size:
+            with open(save_file, "r+b") as f:
+                f.truncate(valid_size)
+
+    def write_snapshot(self) -> None:
+        save_file = self.get_save_file()
+        tmp_file = save_file.with_suffix(".log.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            for key, value in self.data.items():
+                f.write(json.dumps({"k": key, "v": value}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_file, save_file)
+        self.record_count = len(self.data)
 
-class ModelKeyValueStore(KeyValueStore, Generic[T]):
+    def append_records(self, records: list[dict]) -> None:
+        self._log_file.write("".join(json.dumps(record) + "\n" for record in records))
+        self._log_file.flush()
+        os.fsync(self._log_file.fileno())
+        self.record_count += len(records)
+
+    def compact(self) -> None:
+        with self._lock:
+            self._log_file.close()
+            self.write_snapshot()
+            self._log_file = open(self.get_save_file(), "a", encoding="utf-8")
+
+    def should_compact(self) -> bool:
+        return (
+            self.record_count > self.compact_min_records
+            and self.record_count > self.compact_ratio * len(self.data)
+        )
+
+    def get(self, key: str) -> str | None:
+        return self.data.get(key)
+
+    def keys(self) -> list[str]:
+        return list(self.data)
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self.append_records([{"k": key, "v": value}])
+            self.data[key] = value
+
+        if self.should_compact():
+            self.compact()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key not in self.data:
+                raise KeyError(key)
+            self.append_records([{"k": key}])
+            del self.data[key]
+
+        if self.should_compact():
+            self.compact()
+
+    def set_many(self, items: dict[str, str]) -> None:
+        with self._lock:
+            self.append_records(
+                [{"k": key, "v": value} for key, value in items.items()]
+            )
+            self.data.update(items)
+
+        if self.should_compact():
+            self.compact()
+
+    def delete_many(self, keys: list[str]) -> None:
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            missing = [key for key in keys if key not in self.data]
+            if missing:
+                raise KeyError(*missing)
+            self.append_records([{"k": key} for key in keys])
+            for key in keys:
+                del self.data[key]
+
+        if self.should_compact():
+            self.compact()
+
+
+class SQLiteKeyValueStore(BaseKeyValueStore):
+    """
+    SQLite key value store in WAL mode.
+
+    Safe to share between threads and between processes on the same host:
+    every thread gets its own connection, writers are serialized by SQLite
+    and readers never block on them. Batch operations run in one transaction.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        save_dir: pathlib.Path,
+        busy_timeout: float = 30,
+    ) -> None:
+        self.name: str = name
+        self.save_dir: pathlib.Path = save_dir
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            # Carry over entries written by the JSON store
+            legacy_file = self.save_dir / f"{self.name}.json"
+            is_empty = conn.execute("SELECT 1 FROM kv LIMIT 1").fetchone() is None
+            if is_empty and legacy_file.exists():
+                with open(legacy_file) as f:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO kv (key, value) VALUES (?, ?)",
+                        json.load(f).items(),
+                    )
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            raise e
+
+    def get_save_file(self) -> pathlib.Path:
+        return self.save_dir / f"{self.name}.db"
+
+    def connection(self) -> sqlite3.Connection:
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.get_save_file(),
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> str | None:
+        row = (
+            self.connection()
+            .execute("SELECT value FROM kv WHERE key = ?", (key,))
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def set(self, key: str, value: str) -> None:
+        self.set_many({key: value})
+
+    def delete(self, key: str) -> None:
+        cursor = self.connection().execute("DELETE FROM kv WHERE key = ?", (key,))
+        if cursor.rowcount == 0:
+            raise KeyError(key)
+
+    def keys(self) -> list[str]:
+        rows = self.connection().execute("SELECT key FROM kv").fetchall()
+        return [row[0] for row in rows]
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        rows = (
+            self.connection()
+            .execute(f"SELECT key, value FROM kv WHERE key IN ({placeholders})", keys)
+            .fetchall()
+        )
+        return dict(rows)
+
+    def set_many(self, items: dict[str, str]) -> None:
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO kv (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                items.items(),
+            )
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            raise e
+
+    def delete_many(self, keys: list[str]) -> None:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = {
+                row[0]
+                for row in conn.execute(
+                    f"SELECT key FROM kv WHERE key IN ({','.join('?' * len(keys))})",
+                    keys,
+                )
+            }
+            missing = [key for key in keys if key not in existing]
+            if missing:
+                raise KeyError(*missing)
+            conn.executemany("DELETE FROM kv WHERE key = ?", [(key,) for key in keys])
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            raise e
+
+
+def create_store(
+    backend: StoreBackend,
+    name: str,
+    save_dir: pathlib.Path,
+) -> BaseKeyValueStore:
+    match backend:
+        case StoreBackend.LOG:
+            return LogKeyValueStore(name, save_dir)
+        case StoreBackend.SQLITE:
+            return SQLiteKeyValueStore(name, save_dir)
+        case _:
+            return KeyValueStore(name, save_dir)
+
+
+class ModelKeyValueStore(Generic[T]):
     type: Type[T]
 
     def __init__(
@@ -55,16 +411,40 @@ class ModelKeyValueStore(KeyValueStore, Generic[T]):
         name: str,
         save_dir: pathlib.Path,
         model: Type[T],
+        backend: StoreBackend = StoreBackend.JSON,
     ) -> None:
-        super().__init__(name, save_dir)
+        self.store: BaseKeyValueStore = create_store(backend, name, save_dir)
 
         self.type = model
 
     def get(self, key: str) -> T | None:
-        value = super().get(key)
+        value = self.store.get(key)
         if value:
             return self.type.model_validate_json(value)
         return None
 
     def set(self, key: str, value: T) -> None:
-        super().set(key=key, value=value.model_dump_json())
+        self.store.set(key=key, value=value.model_dump_json())
+
+    def update(self, key: str, value: T) -> None:
+        self.set(key, value)
+
+    def delete(self, key: str) -> None:
+        self.store.delete(key)
+
+    def keys(self) -> list[str]:
+        return self.store.keys()
+
+    def get_many(self, keys: list[str]) -> dict[str, T]:
+        return {
+            key: self.type.model_validate_json(value)
+            for key, value in self.store.get_many(keys).items()
+        }
+
+    def set_many(self, items: dict[str, T]) -> None:
+        self.store.set_many(
+            {key: value.model_dump_json() for key, value in items.items()}
+        )
+
+    def delete_many(self, keys: list[str]) -> None:
+        self.store.delete_many(keys)
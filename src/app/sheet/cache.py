@@ -0,0 +1,80 @@
+import threading
+import time
+
+from functools import wraps
+from typing import Callable, ParamSpec, TypeVar
+
+from gspread.worksheet import Worksheet
+
+from .. import config
+from . import logger
+from .g_sheet import gsheet_client
+
+T_Rt = TypeVar("T_Rt")
+T_Pr = ParamSpec("T_Pr")
+
+
+class WorksheetCache:
+    """
+    Worksheet handles keyed by `(sheet_id, sheet_name)`.
+
+    Opening a worksheet costs two metadata round trips, so handles are
+    reused for `ttl` seconds or until a call using them fails.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._entries: dict[tuple[str, str], tuple[Worksheet, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, sheet_id: str, sheet_name: str) -> Worksheet:
+        key = (sheet_id, sheet_name)
+        entry = self._entries.get(key)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+
+        worksheet = gsheet_client.open_by_key(sheet_id).worksheet(sheet_name)
+        with self._lock:
+            self._entries[key] = (worksheet, time.monotonic() + self.ttl)
+
+        return worksheet
+
+    def invalidate(
+        self,
+        sheet_id: str | None = None,
+        sheet_name: str | None = None,
+    ) -> None:
+        with self._lock:
+            if sheet_id is None or sheet_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop((sheet_id, sheet_name), None)
+
+
+worksheet_cache = WorksheetCache(ttl=config.SHEET_WORKSHEET_CACHE_TTL)
+
+
+def invalidate_worksheet_on_error(func: Callable[T_Pr, T_Rt]) -> Callable[T_Pr, T_Rt]:
+    """
+    Drop the cached worksheet handle when `func` raises, so a retry reopens it.
+
+    The handle is looked up from the `sheet_id`/`sheet_name` keyword arguments,
+    or from the model the method is bound to; otherwise the cache is cleared.
+    """
+
+    @wraps(func)
+    def inner(*args: T_Pr.args, **kwargs: T_Pr.kwargs) -> T_Rt:
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            owner = args[0] if args else None
+            sheet_id = kwargs.get("sheet_id", getattr(owner, "sheet_id", None))
+            sheet_name = kwargs.get("sheet_name", getattr(owner, "sheet_name", None))
+            logger.info(f"Invalidate worksheet cache: {sheet_id} | {sheet_name}")
+            worksheet_cache.invalidate(
+                sheet_id if isinstance(sheet_id, str) else None,
+                sheet_name if isinstance(sheet_name, str) else None,
+            )
+            raise e
+
+    return inner
@@ -3,4 +3,8 @@ from .. import config
 
 from gspread import service_account
 
-gsheet_client = service_account(ROOT_PATH.joinpath(config.KEYS_PATH))
+from .rate_limit import RateLimitedHTTPClient
+
+gsheet_client = service_account(
+    ROOT_PATH.joinpath(config.KEYS_PATH), http_client=RateLimitedHTTPClient
+)
@@ -8,20 +8,32 @@ from typing import (
     Generic,
     Any,
     ClassVar,
+    Sequence,
 )
 
 from gspread.worksheet import Worksheet
-from gspread.utils import ValueInputOption
+from gspread.utils import ValueInputOption, absolute_range_name
 from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+from pydantic.fields import FieldInfo
 
 from app import config
+from app.paths import DATA_PATH
 
-from ..shared.decorators import retry_on_fail
+from ..shared.enums import Upstream
+from ..shared.retry import retry
 from .enums import CheckType
 from .g_sheet import gsheet_client
+from .cache import worksheet_cache, invalidate_worksheet_on_error
 from .exceptions import SheetError
+from .row_allocator import RowAllocator
+from .sink import WriteBehindSink
 from ..shared.utils import formated_datetime
-from .utils import col_index_to_a1
+from .utils import (
+    build_block_updates,
+    col_index_to_a1,
+    col_a1_to_index,
+    first_range_value,
+)
 
 T = TypeVar("T")
 
@@ -40,10 +52,53 @@ class BatchCellUpdatePayload(BaseModel, Generic[T]):
     value: T
 
 
+class ColumnSchema(BaseModel):
+    """
+    Sheet columns of a `ColSheetModel` subclass, computed once per class.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    # Field name -> column, in field order
+    read_columns: dict[str, str]
+    update_columns: dict[str, str]
+    note_column: str | None = None
+    # Column -> field name
+    field_by_column: dict[str, str]
+
+    @classmethod
+    def from_model_fields(cls, model_fields: dict[str, FieldInfo]) -> "ColumnSchema":
+        read_columns: dict[str, str] = {}
+        update_columns: dict[str, str] = {}
+        note_column: str | None = None
+
+        for field_name, field_info in model_fields.items():
+            for metadata in field_info.metadata:
+                if isinstance(metadata, dict) and COL_META in metadata:
+                    read_columns[field_name] = metadata[COL_META]
+                    if metadata.get(IS_UPDATE_META):
+                        update_columns[field_name] = metadata[COL_META]
+                    if metadata.get(IS_NOTE_META) and note_column is None:
+                        note_column = metadata[COL_META]
+                    break
+
+        return cls(
+            read_columns=read_columns,
+            update_columns=update_columns,
+            note_column=note_column,
+            field_by_column={v: k for k, v in read_columns.items()},
+        )
+
+
 class ColSheetModel(BaseModel):
     # Model config
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
+    # Set for every subclass by __pydantic_init_subclass__
+    column_schema: ClassVar[ColumnSchema] = ColumnSchema(
+        read_columns={}, update_columns={}, field_by_column={}
+    )
+
     sheet_id: str
     sheet_name: str
     index: int
@@ -54,49 +109,32 @@ class ColSheetModel(BaseModel):
         sheet_id: str,
         sheet_name: str,
     ) -> Worksheet:
-        spreadsheet = gsheet_client.open_by_key(sheet_id)
-        worksheet = spreadsheet.worksheet(sheet_name)
-
-        return worksheet
+        return worksheet_cache.get(sheet_id=sheet_id, sheet_name=sheet_name)
 
     @classmethod
-    def mapping_fields(cls) -> dict:
-        mapping_fields = {}
-        for field_name, field_info in cls.model_fields.items():
-            if hasattr(field_info, "metadata"):
-                for metadata in field_info.metadata:
-                    if COL_META in metadata:
-                        mapping_fields[field_name] = metadata[COL_META]
-                        break
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        cls.column_schema = ColumnSchema.from_model_fields(cls.model_fields)
 
-        return mapping_fields
+    @classmethod
+    def mapping_fields(cls) -> dict[str, str]:
+        # A copy, callers must not change the shared schema
+        return dict(cls.column_schema.read_columns)
 
     @classmethod
-    def updated_mapping_fields(cls) -> dict:
-        mapping_fields = {}
-        for field_name, field_info in cls.model_fields.items():
-            if hasattr(field_info, "metadata"):
-                for metadata in field_info.metadata:
-                    if (
-                        COL_META in metadata
-                        and IS_UPDATE_META in metadata
-                        and metadata[IS_UPDATE_META]
-                    ):
-                        mapping_fields[field_name] = metadata[COL_META]
-                        break
-
-        return mapping_fields
+    def updated_mapping_fields(cls) -> dict[str, str]:
+        return dict(cls.column_schema.update_columns)
 
     @classmethod
     def get_col_by_attribute_name(cls, attribute_name: str) -> str:
-        mapping_fields = cls.mapping_fields()
-        for field_name, col_name in mapping_fields.items():
-            if attribute_name == field_name:
-                return col_name
+        col_name = cls.column_schema.read_columns.get(attribute_name)
+        if col_name is None:
+            raise SheetError(f"Can not field col with attribute name: {attribute_name}")
 
-        raise SheetError(f"Can not field col with attribute name: {attribute_name}")
+        return col_name
 
     @classmethod
+    @invalidate_worksheet_on_error
     def get(
         cls,
         sheet_id: str,
@@ -128,6 +166,7 @@ class ColSheetModel(BaseModel):
         return cls.model_validate(model_dict)
 
     @classmethod
+    @invalidate_worksheet_on_error
     def batch_get(
         cls,
         sheet_id: str,
@@ -181,7 +220,8 @@ class ColSheetModel(BaseModel):
         return result_list
 
     @classmethod
-    @retry_on_fail(max_retries=3, sleep_interval=30)
+    @retry(Upstream.SHEETS, max_retries=3, base_delay=5)
+    @invalidate_worksheet_on_error
     def batch_update(
         cls,
         sheet_id: str,
@@ -193,25 +233,79 @@ class ColSheetModel(BaseModel):
             sheet_name=sheet_name,
         )
         mapping_dict = cls.updated_mapping_fields()
-        update_batch = []
+        field_names = list(mapping_dict.keys())
 
+        rows: dict[int, list[Any]] = {}
         for object in list_object:
             model_dict = object.model_dump(mode="json")
+            rows[object.index] = [model_dict[k] for k in field_names]
 
-            for k, v in mapping_dict.items():
-                update_batch.append(
-                    {
-                        "range": f"{v}{object.index}",
-                        "values": [[model_dict[k]]],
-                    }
-                )
+        cls.write_rows(worksheet, list(mapping_dict.values()), rows)
+
+    @classmethod
+    @retry(Upstream.SHEETS, max_retries=3, base_delay=5)
+    @invalidate_worksheet_on_error
+    def batch_update_rows(
+        cls,
+        sheet_id: str,
+        sheet_name: str,
+        field_names: list[str],
+        rows: dict[int, Sequence[Any]],
+    ) -> None:
+        """
+        Write plain row values without building model objects.
+
+        Args:
+            sheet_id: Spreadsheet id.
+            sheet_name: Worksheet name.
+            field_names: Fields of the values of each row, in order.
+            rows: Row index -> values of `field_names`.
+        """
+        worksheet = cls.get_worksheet(
+            sheet_id=sheet_id,
+            sheet_name=sheet_name,
+        )
+        columns = [cls.get_col_by_attribute_name(k) for k in field_names]
+        cls.write_rows(worksheet, columns, rows)
 
-        if len(list_object) > 0:
+    @staticmethod
+    def write_rows(
+        worksheet: Worksheet,
+        columns: list[str],
+        rows: dict[int, Sequence[Any]],
+    ) -> None:
+        for update_batch in build_block_updates(columns, rows):
             worksheet.batch_update(
                 update_batch, value_input_option=ValueInputOption.user_entered
             )
 
-    @retry_on_fail(max_retries=3, sleep_interval=30)
+    @classmethod
+    @retry(Upstream.SHEETS, max_retries=3, base_delay=5)
+    @invalidate_worksheet_on_error
+    def batch_clear(
+        cls,
+        sheet_id: str,
+        sheet_name: str,
+        indexes: list[int],
+        field_names: list[str],
+    ) -> None:
+        """
+        Empty the columns of `field_names` on the rows of `indexes`, other
+        columns of these rows are left untouched.
+        """
+        worksheet = cls.get_worksheet(
+            sheet_id=sheet_id,
+            sheet_name=sheet_name,
+        )
+        columns = [cls.get_col_by_attribute_name(k) for k in field_names]
+
+        rows: dict[int, Sequence[Any]] = {
+            index: [""] * len(columns) for index in indexes
+        }
+        cls.write_rows(worksheet, columns, rows)
+
+    @retry(Upstream.SHEETS, max_retries=3, base_delay=5)
+    @invalidate_worksheet_on_error
     def update(
         self,
     ) -> None:
@@ -222,21 +316,12 @@ class ColSheetModel(BaseModel):
             sheet_id=self.sheet_id, sheet_name=self.sheet_name
         )
 
-        update_batch = []
-        for k, v in mapping_dict.items():
-            update_batch.append(
-                {
-                    "range": f"{v}{self.index}",
-                    "values": [[model_dict[k]]],
-                }
-            )
-
-        worksheet.batch_update(
-            update_batch, value_input_option=ValueInputOption.user_entered
-        )
+        rows = {self.index: [model_dict[k] for k in mapping_dict]}
+        self.write_rows(worksheet, list(mapping_dict.values()), rows)
 
     @classmethod
-    @retry_on_fail(max_retries=5, sleep_interval=30)
+    @retry(Upstream.SHEETS, max_retries=5, base_delay=5)
+    @invalidate_worksheet_on_error
     def update_note_message(
         cls,
         sheet_id: str,
@@ -244,66 +329,58 @@ class ColSheetModel(BaseModel):
         index: int,
         messages: str,
     ):
-        for field_name, field_info in cls.model_fields.items():
-            if hasattr(field_info, "metadata"):
-                for metadata in field_info.metadata:
-                    if COL_META in metadata and IS_NOTE_META in metadata:
-                        worksheet = cls.get_worksheet(
-                            sheet_id=sheet_id,
-                            sheet_name=sheet_name,
-                        )
-
-                        worksheet.batch_update(
-                            [
-                                {
-                                    "range": f"{metadata[COL_META]}{index}",
-                                    "values": [[messages]],
-                                }
-                            ],
-                            value_input_option=ValueInputOption.user_entered,
-                        )
-                        return
-
-        raise SheetError("Can't update sheet message")
+        note_col = cls.column_schema.note_column
+        if note_col is None:
+            raise SheetError("Can't update sheet message")
+
+        worksheet = cls.get_worksheet(
+            sheet_id=sheet_id,
+            sheet_name=sheet_name,
+        )
+        worksheet.batch_update(
+            [
+                {
+                    "range": f"{note_col}{index}",
+                    "values": [[messages]],
+                }
+            ],
+            value_input_option=ValueInputOption.user_entered,
+        )
 
     @classmethod
-    @retry_on_fail(max_retries=5, sleep_interval=30)
+    @retry(Upstream.SHEETS, max_retries=5, base_delay=5)
+    @invalidate_worksheet_on_error
     def batch_update_note_message(
         cls,
         sheet_id: str,
         sheet_name: str,
         update_payloads: list[NoteMessageUpdatePayload],
     ):
-        for field_name, field_info in cls.model_fields.items():
-            if hasattr(field_info, "metadata"):
-                for metadata in field_info.metadata:
-                    if (
-                        COL_META in metadata
-                        and IS_NOTE_META in metadata
-                        and metadata[IS_NOTE_META]
-                    ):
-                        worksheet = cls.get_worksheet(
-                            sheet_id=sheet_id,
-                            sheet_name=sheet_name,
-                        )
-
-                        batch: list[dict] = []
-                        for payload in update_payloads:
-                            batch.append(
-                                {
-                                    "range": f"{metadata[COL_META]}{payload.index}",
-                                    "values": [[payload.message]],
-                                }
-                            )
-                        worksheet.batch_update(
-                            batch, value_input_option=ValueInputOption.user_entered
-                        )
-                        return
-
-        raise SheetError("Can't update sheet message")
+        note_col = cls.column_schema.note_column
+        if note_col is None:
+            raise SheetError("Can't update sheet message")
+
+        if not update_payloads:
+            return
+
+        worksheet = cls.get_worksheet(
+            sheet_id=sheet_id,
+            sheet_name=sheet_name,
+        )
+
+        batch: list[dict] = []
+        for payload in update_payloads:
+            batch.append(
+                {
+                    "range": f"{note_col}{payload.index}",
+                    "values": [[payload.message]],
+                }
+            )
+        worksheet.batch_update(batch, value_input_option=ValueInputOption.user_entered)
 
     @classmethod
-    @retry_on_fail(max_retries=5, sleep_interval=30)
+    @retry(Upstream.SHEETS, max_retries=5, base_delay=5)
+    @invalidate_worksheet_on_error
     def free_style_batch_update(
         cls,
         sheet_id: str,
@@ -323,7 +400,7 @@ class ColSheetModel(BaseModel):
         worksheet.batch_update(batch, value_input_option=ValueInputOption.user_entered)
 
     @classmethod
-    @retry_on_fail(max_retries=5, sleep_interval=10)
+    @retry(Upstream.SHEETS, max_retries=5, base_delay=2)
     def get_cell_value(
         cls,
         sheet_id: str,
@@ -427,7 +504,8 @@ class RowModel(ColSheetModel):
     ] = None
 
     @classmethod
-    @retry_on_fail(max_retries=5, sleep_interval=10)
+    @retry(Upstream.SHEETS, max_retries=5, base_delay=2)
+    @invalidate_worksheet_on_error
     def get_run_indexes(
         cls, sheet_id: str, sheet_name: str, col_index: int
     ) -> list[int]:
@@ -594,42 +672,55 @@ class G2GTopUpProduct(ColSheetModel):
             - Skips invalid rows that fail model validation
             - Exchange rates will be -1 if not found in specified cells
             - Only processes columns that match the G2GTopUpProduct field mappings
+            - Reads the rate cells and the mapped column range in one batch request
         """
 
         g2g_top_up_products: list[G2GTopUpProduct] = []
-        worksheet = G2GTopUpProduct.get_worksheet(
-            sheet_id=sheet_id, sheet_name=sheet_name
+        # Positions of mapped fields inside the fetched column range
+        col_indexes = {
+            field_name: col_a1_to_index(col)
+            for field_name, col in G2GTopUpProduct.column_schema.read_columns.items()
+        }
+        first_col = min(col_indexes.values())
+        last_col = max(col_indexes.values())
+        width = last_col - first_col + 1
+        field_positions = [
+            (field_name, col_index - first_col)
+            for field_name, col_index in col_indexes.items()
+        ]
+
+        # Rates and the mapped column range in a single request
+        res = gsheet_client.http_client.values_batch_get(
+            id=sheet_id,
+            ranges=[
+                absolute_range_name(sheet_name, config.IDR_TO_USD_RATE_CELL),
+                absolute_range_name(sheet_name, config.SGD_TO_USD_RATE_CELL),
+                absolute_range_name(
+                    sheet_name,
+                    f"{col_index_to_a1(first_col)}{start_row}:{col_index_to_a1(last_col)}",
+                ),
+            ],
         )
+        idr_range, sgd_range, products_range = res.get("valueRanges", [{}, {}, {}])
 
-        all_cells = worksheet.get_all_cells()
+        IDR_to_USE_rate = float(first_range_value(idr_range) or -1)
+        SGD_to_USE_rate = float(first_range_value(sgd_range) or -1)
 
-        _temp_product_dict: dict[str, dict] = {}
+        for offset, row in enumerate(products_range.get("values", [])):
+            # Trailing empty cells are omitted by the API, read them as ""
+            if len(row) < width:
+                row = row + [""] * (width - len(row))
 
-        mapping_fields = G2GTopUpProduct.mapping_fields()
-        reversed_mapping_dict: dict = {v: k for k, v in mapping_fields.items()}
-
-        for cell in all_cells:
-            if cell.address == config.IDR_TO_USD_RATE_CELL:
-                IDR_to_USE_rate = float(cell.value if cell.value else -1)
-            if cell.address == config.SGD_TO_USD_RATE_CELL:
-                SGD_to_USE_rate = float(cell.value if cell.value else -1)
-
-            if cell.row >= start_row:
-                if str(cell.row) not in _temp_product_dict:
-                    _temp_product_dict[str(cell.row)] = {
-                        "index": cell.row,
-                        "sheet_id": sheet_id,
-                        "sheet_name": sheet_name,
-                    }
-                if col_index_to_a1(cell.col) in reversed_mapping_dict:
-                    _temp_product_dict[str(cell.row)][
-                        reversed_mapping_dict[col_index_to_a1(cell.col)]
-                    ] = cell.value
+            model_dict: dict[str, Any] = {
+                "index": start_row + offset,
+                "sheet_id": sheet_id,
+                "sheet_name": sheet_name,
+            }
+            for field_name, position in field_positions:
+                model_dict[field_name] = row[position]
 
-        for _, value in _temp_product_dict.items():
             try:
-                g2g_top_up_product = G2GTopUpProduct.model_validate(value)
-                g2g_top_up_products.append(g2g_top_up_product)
+                g2g_top_up_products.append(G2GTopUpProduct.model_validate(model_dict))
             except ValidationError:
                 pass
 
@@ -825,34 +916,58 @@ class LogToSheet(ColSheetModel):
     ] = None
 
     @classmethod
+    @invalidate_worksheet_on_error
     def get_last_log_row(
         cls,
     ) -> int:
-        worksheet = cls.get_worksheet(
-            sheet_id=cls.sheet_id,
-            sheet_name=cls.sheet_name,
-        )
-
-        return len(worksheet.col_values(1))
+        return log_row_allocator.peek() - 1
 
     @classmethod
+    @invalidate_worksheet_on_error
     def register_note_row(cls) -> "LogToSheet":
+        time_value = formated_datetime(datetime.now())
+        if log_sheet_sink.running:
+            next_log_row_index = log_sheet_sink.allocate_row()
+            log_sheet_sink.submit(next_log_row_index, {"time": time_value})
+            return LogToSheet(index=next_log_row_index, time=time_value)
+
         worksheet = cls.get_worksheet(
             sheet_id=cls.sheet_id,
             sheet_name=cls.sheet_name,
         )
-        next_log_row_index = len(worksheet.col_values(1)) + 1
+        next_log_row_index = log_row_allocator.allocate()
         time_col = cls.get_col_by_attribute_name("time")
-        time_value = formated_datetime(datetime.now())
         worksheet.update([[time_value]], f"{time_col}{next_log_row_index}")
         return LogToSheet(index=next_log_row_index, time=time_value)
 
+    def update(self) -> None:
+        if log_sheet_sink.running:
+            log_sheet_sink.submit(
+                self.index,
+                self.model_dump(
+                    mode="json", include=set(self.updated_mapping_fields())
+                ),
+            )
+            return
+
+        super().update()
+
     @classmethod
     def note_delivery(
         cls,
         note_index: int,
         note: str,
     ) -> None:
+        if log_sheet_sink.running:
+            log_sheet_sink.submit(
+                note_index,
+                {
+                    "delivery_at": formated_datetime(datetime.now()),
+                    "delivery_note": note,
+                },
+            )
+            return
+
         delivery_at_col = cls.get_col_by_attribute_name("delivery_at")
         delivery_note_col = cls.get_col_by_attribute_name("delivery_note")
         cls.free_style_batch_update(
@@ -876,3 +991,19 @@ class LogToSheet(ColSheetModel):
 
         self.receive_note += f"\n{note}"
         self.receive_note.strip()
+
+
+log_row_allocator = RowAllocator(
+    name="log_rows",
+    save_dir=DATA_PATH / "store",
+    sheet_id=LogToSheet.sheet_id,
+    sheet_name=LogToSheet.sheet_name,
+)
+
+log_sheet_sink = WriteBehindSink(
+    model=LogToSheet,
+    sheet_id=LogToSheet.sheet_id,
+    sheet_name=LogToSheet.sheet_name,
+    row_allocator=log_row_allocator,
+    flush_interval=config.LOG_SHEET_FLUSH_INTERVAL,
+)
@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from gspread.http_client import HTTPClient
+from requests import Response
+
+from .. import config
+from ..shared.enums import RequestPriority
+from ..shared.rate_limit import PriorityTokenBucket
+
+sheets_read_bucket = PriorityTokenBucket(
+    rate=config.SHEETS_READ_RATE_LIMIT, capacity=config.SHEETS_RATE_LIMIT_BURST
+)
+sheets_write_bucket = PriorityTokenBucket(
+    rate=config.SHEETS_WRITE_RATE_LIMIT, capacity=config.SHEETS_RATE_LIMIT_BURST
+)
+# Buckets are per process, priorities only order the requests of one
+# process. BULK requests also take a token of these lower budgets, so a
+# sync script leaves the rest of the quota to the server.
+sheets_bulk_read_bucket = PriorityTokenBucket(
+    rate=config.SHEETS_BULK_READ_RATE_LIMIT, capacity=1
+)
+sheets_bulk_write_bucket = PriorityTokenBucket(
+    rate=config.SHEETS_BULK_WRITE_RATE_LIMIT, capacity=1
+)
+
+# Priority of the Sheets requests made by the current task or thread
+sheets_priority: ContextVar[RequestPriority] = ContextVar(
+    "sheets_priority", default=RequestPriority.DEFAULT
+)
+
+
+@contextmanager
+def sheets_priority_scope(priority: RequestPriority) -> Iterator[None]:
+    token = sheets_priority.set(priority)
+    try:
+        yield
+    finally:
+        sheets_priority.reset(token)
+
+
+class RateLimitedHTTPClient(HTTPClient):
+    """
+    gspread HTTP client that takes a token of the process-wide read or write
+    bucket before every request, by the priority of `sheets_priority`.
+    BULK requests first take a token of the matching bulk bucket.
+    """
+
+    def request(
+        self, method: str, endpoint: str, *args: Any, **kwargs: Any
+    ) -> Response:
+        priority = sheets_priority.get()
+        if method.upper() == "GET":
+            bucket, bulk_bucket = sheets_read_bucket, sheets_bulk_read_bucket
+        else:
+            bucket, bulk_bucket = sheets_write_bucket, sheets_bulk_write_bucket
+
+        if priority == RequestPriority.BULK:
+            bulk_bucket.acquire()
+        bucket.acquire(priority=priority.value)
+        return super().request(method, endpoint, *args, **kwargs)
+
+
+def get_sheets_rate_limit_metrics() -> dict[str, Any]:
+    metrics: dict[str, Any] = {}
+    for name, bucket in (
+        ("read_queue_depth", sheets_read_bucket),
+        ("write_queue_depth", sheets_write_bucket),
+    ):
+        depth = bucket.queue_depth()
+        metrics[name] = {
+            priority.name.lower(): depth.get(priority.value, 0)
+            for priority in RequestPriority
+        }
+
+    return metrics
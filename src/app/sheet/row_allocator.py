@@ -0,0 +1,128 @@
+import json
+import os
+import pathlib
+import threading
+
+from contextlib import contextmanager
+from typing import Iterator
+
+from . import logger
+from .cache import worksheet_cache
+from .utils import col_a1_to_index
+
+try:
+    import fcntl
+except ImportError:  # Windows, only threads of this process are serialized
+    fcntl = None
+
+
+class RowAllocator:
+    """
+    Hands out unique rows of a sheet in O(1).
+
+    The next free row is a high-water mark persisted in `<name>.json` and
+    updated under a file lock, so concurrent requests and processes never
+    get the same row. The mark is bootstrapped from the full `column` once,
+    later `reconcile` only reads the `window` rows after it to skip rows
+    written by someone else.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        save_dir: pathlib.Path,
+        sheet_id: str,
+        sheet_name: str,
+        column: str = "A",
+        window: int = 50,
+    ) -> None:
+        self.state_file = save_dir / f"{name}.json"
+        self.lock_file = save_dir / f"{name}.lock"
+        self.sheet_id = sheet_id
+        self.sheet_name = sheet_name
+        self.column = column
+        self.window = window
+
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        with self._lock, open(self.lock_file, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read_next_row(self) -> int | None:
+        if not self.state_file.exists():
+            return None
+
+        with open(self.state_file) as f:
+            return json.load(f)["next_row"]
+
+    def write_next_row(self, next_row: int) -> None:
+        tmp_file = self.state_file.with_suffix(".json.tmp")
+        with open(tmp_file, "w") as f:
+            json.dump({"next_row": next_row}, f)
+        os.replace(tmp_file, self.state_file)
+
+    def count_sheet_rows(self) -> int:
+        worksheet = worksheet_cache.get(self.sheet_id, self.sheet_name)
+        return len(worksheet.col_values(col_a1_to_index(self.column)))
+
+    def skip_written_rows(self, next_row: int) -> int:
+        """
+        Move `next_row` past rows of the sheet that are already written.
+        """
+        worksheet = worksheet_cache.get(self.sheet_id, self.sheet_name)
+        while True:
+            last_row = next_row + self.window - 1
+            values = worksheet.get(f"{self.column}{next_row}:{self.column}{last_row}")
+            filled = [offset for offset, row in enumerate(values) if row and row[0]]
+            if not filled:
+                return next_row
+
+            next_row += filled[-1] + 1
+            if filled[-1] < self.window - 1:
+                return next_row
+
+    def find_next_row(self) -> int:
+        next_row = self.read_next_row()
+        if next_row is None:
+            return self.count_sheet_rows() + 1
+
+        return self.skip_written_rows(next_row)
+
+    def peek(self) -> int:
+        """
+        Next free row, neither allocated nor persisted.
+        """
+        with self.locked():
+            return self.find_next_row()
+
+    def reconcile(self) -> int:
+        """
+        Sync the high-water mark with the sheet.
+
+        Returns:
+            int: Next free row.
+        """
+        with self.locked():
+            next_row = self.find_next_row()
+            self.write_next_row(next_row)
+
+        logger.info(f"Next free row of {self.sheet_name}: {next_row}")
+        return next_row
+
+    def allocate(self) -> int:
+        with self.locked():
+            next_row = self.read_next_row()
+            if next_row is None:
+                next_row = self.count_sheet_rows() + 1
+
+            self.write_next_row(next_row + 1)
+
+        return next_row
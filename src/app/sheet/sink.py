@@ -0,0 +1,122 @@
+import asyncio
+import threading
+
+from typing import TYPE_CHECKING, Any
+
+from . import logger
+from .row_allocator import RowAllocator
+from .rate_limit import sheets_priority
+from ..shared.enums import RequestPriority
+
+if TYPE_CHECKING:
+    from .models import ColSheetModel
+
+
+class WriteBehindSink:
+    """
+    Write-behind buffer of sheet row updates.
+
+    Rows are allocated by `row_allocator`, reconciled with the sheet once by
+    `start`. Field updates are coalesced per row in memory and flushed every
+    `flush_interval` seconds in one batched write, so callers never wait on
+    the Sheets API. Updates that fail to flush are kept for the next flush.
+
+    While the sink is not running, callers write synchronously themselves.
+    """
+
+    def __init__(
+        self,
+        model: type["ColSheetModel"],
+        sheet_id: str,
+        sheet_name: str,
+        row_allocator: RowAllocator,
+        flush_interval: float,
+    ) -> None:
+        self.model = model
+        self.sheet_id = sheet_id
+        self.sheet_name = sheet_name
+        self.row_allocator = row_allocator
+        self.flush_interval = flush_interval
+
+        # Row index -> field name -> value, not yet written
+        self._pending: dict[int, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._flush_task is not None
+
+    def allocate_row(self) -> int:
+        return self.row_allocator.allocate()
+
+    def submit(self, index: int, values: dict[str, Any]) -> None:
+        """
+        Queue field updates of a row, None values are ignored.
+        """
+        with self._lock:
+            row = self._pending.setdefault(index, {})
+            row.update({k: v for k, v in values.items() if v is not None})
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+
+            if not pending:
+                return
+
+            field_names = list(self.model.updated_mapping_fields())
+            try:
+                self.model.batch_update_rows(
+                    sheet_id=self.sheet_id,
+                    sheet_name=self.sheet_name,
+                    field_names=field_names,
+                    rows={
+                        index: [values.get(k) for k in field_names]
+                        for index, values in pending.items()
+                    },
+                )
+            except Exception:
+                # Put the rows back under any update queued meanwhile
+                with self._lock:
+                    for index, values in pending.items():
+                        self._pending[index] = values | self._pending.get(index, {})
+                raise
+
+        logger.info(f"Flushed {len(pending)} rows to {self.sheet_name}")
+
+    async def _flush_forever(self) -> None:
+        # Order logs are flushed ahead of bulk sheet syncs
+        sheets_priority.set(RequestPriority.ORDER)
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.exception(e)
+
+    async def start(self) -> None:
+        try:
+            await asyncio.to_thread(self.row_allocator.reconcile)
+        except Exception as e:
+            logger.exception(e)
+            logger.info(
+                f"Can not reconcile {self.sheet_name} rows, writing synchronously"
+            )
+            return
+
+        self._flush_task = asyncio.create_task(self._flush_forever())
+
+    async def stop(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+        try:
+            await asyncio.to_thread(self.flush)
+        except Exception as e:
+            logger.exception(e)
+            logger.error(f"Lost {len(self._pending)} pending rows of {self.sheet_name}")
@@ -1,6 +1,105 @@
-from gspread.utils import rowcol_to_a1
+from typing import Any, Final, Sequence
+
+from gspread.utils import rowcol_to_a1, column_letter_to_index
 
 
 def col_index_to_a1(col: int) -> str:
     full_a1_annotation = rowcol_to_a1(row=1, col=col)
     return full_a1_annotation.replace("1", "")
+
+
+# Cells sent in one values batch update request, keeps the payload well below
+# the Sheets API request size limit
+MAX_CELLS_PER_REQUEST: Final[int] = 20_000
+
+
+def col_a1_to_index(col: str) -> int:
+    return column_letter_to_index(col)
+
+
+def first_range_value(value_range: dict) -> Any | None:
+    values = value_range.get("values")
+    if values and values[0]:
+        return values[0][0]
+
+    return None
+
+
+def contiguous_runs(indexes: list[int]) -> list[tuple[int, int]]:
+    """
+    Group sorted, unique indexes into inclusive `(start, end)` runs.
+    """
+    runs: list[tuple[int, int]] = []
+    for index in indexes:
+        if runs and runs[-1][1] + 1 == index:
+            runs[-1] = (runs[-1][0], index)
+        else:
+            runs.append((index, index))
+
+    return runs
+
+
+def build_block_updates(
+    columns: list[str],
+    rows: dict[int, Sequence[Any]],
+    max_cells: int = MAX_CELLS_PER_REQUEST,
+) -> list[list[dict]]:
+    """
+    Merge per-cell updates into rectangular block ranges like `B2:K2001`.
+
+    Columns between the updated ones are filled with None, which the Sheets
+    API skips, so their content stays untouched.
+
+    Args:
+        columns: Column letters of the values of each row.
+        rows: Row index -> values, in the order of `columns`.
+        max_cells: Maximum number of cells sent in one request.
+
+    Returns:
+        list[list[dict]]: `{"range", "values"}` entries, one list per request.
+    """
+    if not columns or not rows:
+        return []
+
+    col_indexes = [col_a1_to_index(col) for col in columns]
+    first_col = min(col_indexes)
+    last_col = max(col_indexes)
+    width = last_col - first_col + 1
+    positions = [col_index - first_col for col_index in col_indexes]
+    first_col_a1 = col_index_to_a1(first_col)
+    last_col_a1 = col_index_to_a1(last_col)
+
+    max_rows = max(1, max_cells // width)
+
+    batches: list[list[dict]] = []
+    batch: list[dict] = []
+    batch_cells = 0
+    for start, end in contiguous_runs(sorted(rows)):
+        for block_start in range(start, end + 1, max_rows):
+            block_end = min(block_start + max_rows - 1, end)
+
+            values: list[list[Any]] = []
+            for row_index in range(block_start, block_end + 1):
+                row: list[Any] = [None] * width
+                for position, value in zip(positions, rows[row_index]):
+                    row[position] = value
+                values.append(row)
+
+            block_cells = len(values) * width
+            if batch and batch_cells + block_cells > max_cells:
+                batches.append(batch)
+                batch = []
+                batch_cells = 0
+
+            batch.append(
+                {
+                    "range": f"{first_col_a1}{block_start}:{last_col_a1}{block_end}",
+                    "values": values,
+                }
+            )
+            batch_cells += block_cells
+
+    if batch:
+        batches.append(batch)
+
+    return batches
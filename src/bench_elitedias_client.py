@@ -0,0 +1,97 @@
+"""
+Local benchmark: per-request latency of the Elitedias client against a stub
+server, opening a new AsyncClient per call (previous behaviour) versus the
+pooled keep-alive client.
+
+Usage: python bench_elitedias_client.py [requests]
+"""
+
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from app.elite.api_client import ElitediasAPIClient
+
+TRACK_ORDER_RESPONSE = json.dumps(
+    {"order_id": "bench", "order_status": "success"}
+).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(TRACK_ORDER_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(TRACK_ORDER_RESPONSE)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def per_call_client(client: ElitediasAPIClient, order_id: str) -> None:
+    async with httpx.AsyncClient(headers=client.headers) as fresh_client:
+        res = await fresh_client.post(
+            f"{client.base_url}/track_order",
+            json={"order_id": order_id},
+            timeout=60,
+        )
+        res.raise_for_status()
+
+
+async def pooled_client(client: ElitediasAPIClient, order_id: str) -> None:
+    await client.track_order(order_id)
+
+
+async def measure(func, client: ElitediasAPIClient, total: int) -> list[float]:
+    latencies: list[float] = []
+    for i in range(total):
+        start = time.perf_counter()
+        await func(client, str(i))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:<16} mean {statistics.mean(latencies):7.3f} ms | "
+        f"p50 {statistics.median(latencies):7.3f} ms | p95 {p95:7.3f} ms"
+    )
+
+
+async def main(total: int) -> None:
+    server = start_stub_server()
+    client = ElitediasAPIClient(base_url=f"http://127.0.0.1:{server.server_port}")
+    try:
+        # Warm up both paths once
+        await per_call_client(client, "warmup")
+        await pooled_client(client, "warmup")
+
+        report("per-call client", await measure(per_call_client, client, total))
+        report("pooled client", await measure(pooled_client, client, total))
+    finally:
+        await client.aclose()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
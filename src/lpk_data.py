@@ -1,69 +1,305 @@
+import argparse
+import hashlib
+
 from datetime import datetime
-from typing import Final
+from itertools import batched
+from typing import Any, Final, Iterator, Literal
+
+from pydantic import BaseModel
 
 from app import config, logger
+from app.paths import SRC_PATH
+from app.shared.enums import RequestPriority
+from app.shared.stores import ModelKeyValueStore
+from app.sheet.rate_limit import sheets_priority_scope
 from app.sheet.models import LPKProduct as SheetLPKProduct
-from app.lpk.api_client import lpk_api_client
-from app.lpk.models import Product as LPKProduct, Category as LPKCategory
+from app.lpk.models import Category, Product as LPKProduct
 from app.lpk.consts import COUNTRY_CODES
-from app.shared.utils import formated_datetime, split_list
+from app.lpk.utils import fetch_country_categories, fetch_country_products
+from app.shared.utils import formated_datetime
 
 BATCH_SIZE: Final[int] = 2000
 SHEET_ID: Final[str] = config.SHEET_ID
 SHEET_NAME: Final[str] = "LPK Products"
+# One worker per country, categories then products of every country at once
+FETCH_WORKERS: Final[int] = len(COUNTRY_CODES)
+START_ROW: Final[int] = 2
+
+# Sheet fields of the values in a product row, in order
+ROW_FIELDS: Final[list[str]] = [
+    "code",
+    "category_code",
+    "category",
+    "name",
+    "provider_code",
+    "price",
+    "process_time",
+    "country_code",
+    "status",
+    "Note",
+]
+
+# Changes to these fields make a product row rewritten in delta mode
+HASH_FIELDS: Final[list[str]] = ["price", "status", "process_time", "name"]
+REMOVED_STATUS: Final[str] = "removed"
+
+ProductRow = tuple[Any, ...]
+SyncMode = Literal["full", "delta"]
+
+CODE_POSITION: Final[int] = ROW_FIELDS.index("code")
+COUNTRY_CODE_POSITION: Final[int] = ROW_FIELDS.index("country_code")
+HASH_POSITIONS: Final[list[int]] = [ROW_FIELDS.index(k) for k in HASH_FIELDS]
+
+
+class ProductRowSnapshot(BaseModel):
+    index: int
+    country_code: str
+    hash: str
+    removed: bool = False
+
+
+def product_row_key(row: ProductRow) -> str:
+    return f"{row[COUNTRY_CODE_POSITION]}|{row[CODE_POSITION]}"
+
+
+def product_row_hash(row: ProductRow) -> str:
+    content = "\x1f".join(str(row[position]) for position in HASH_POSITIONS)
+    return hashlib.sha1(content.encode()).hexdigest()
+
 
+def get_catalog_snapshot_store() -> ModelKeyValueStore[ProductRowSnapshot]:
+    return ModelKeyValueStore(
+        name="lpk_catalog_snapshot",
+        save_dir=SRC_PATH / "data" / "store",
+        model=ProductRowSnapshot,
+        backend=config.KV_STORE_BACKEND,
+    )
 
-def main():
-    # print(category_dict)
-    # return
-
-    lpk_products: list[LPKProduct] = []
-    lpk_categories: list[LPKCategory] = []
-    for country_code in COUNTRY_CODES.keys():
-        __lpk_products = lpk_api_client.get_all_products(
-            country_code=country_code
-        ).data.products
-        __categories = lpk_api_client.get_categories(
-            country_code=country_code
-        ).data.categories
-        logger.info(
-            f"Total product for country code {country_code}: {len(__lpk_products)}"
+
+def to_product_row(product: LPKProduct, category: str, note: str) -> ProductRow:
+    return (
+        product.code,
+        product.category_code,
+        category,
+        product.name,
+        product.provider_code,
+        str(product.price),
+        str(product.process_time),
+        product.country_code,
+        product.status,
+        note,
+    )
+
+
+def iter_product_rows(
+    country_products: Iterator[tuple[str, list[LPKProduct]]],
+    country_categories: dict[str, list[Category]],
+    fetched_country_codes: set[str],
+) -> Iterator[ProductRow]:
+    """
+    Rows of every fetched product, in the order of `country_products`.
+
+    Categories of every country are fetched beforehand, so a category name
+    resolves no matter which country lists it, and each country is turned
+    into rows as soon as it arrives.
+    """
+    category_names = {
+        category.code: category.name
+        for categories in country_categories.values()
+        for category in categories
+    }
+
+    note = formated_datetime(datetime.now())
+    for country_code, products in country_products:
+        fetched_country_codes.add(country_code)
+        logger.info(f"Total product for country code {country_code}: {len(products)}")
+        for product in products:
+            yield to_product_row(
+                product, category_names.get(product.category_code, ""), note
+            )
+
+
+def write_product_rows(
+    rows: Iterator[ProductRow],
+    snapshot_store: ModelKeyValueStore[ProductRowSnapshot],
+) -> int:
+    """
+    Write rows from `START_ROW` on in batches of `BATCH_SIZE`, only one batch
+    is held in memory at a time. The snapshot is replaced by the written rows.
+
+    Returns:
+        int: Number of written rows.
+    """
+    stale_keys = set(snapshot_store.keys())
+
+    total_products = 0
+    for batch_number, batch in enumerate(batched(rows, BATCH_SIZE), start=1):
+        logger.info(f"Updating batch: {batch_number}")
+        batch_rows = {
+            START_ROW + total_products + offset: row for offset, row in enumerate(batch)
+        }
+        SheetLPKProduct.batch_update_rows(
+            sheet_id=SHEET_ID,
+            sheet_name=SHEET_NAME,
+            field_names=ROW_FIELDS,
+            rows=batch_rows,
         )
-        lpk_products.extend(__lpk_products)
-        lpk_categories.extend(__categories)
-
-    category_dict = {category.code: category for category in lpk_categories}
-
-    logger.info(f"Total product: {len(lpk_products)}")
-
-    sheet_products: list[SheetLPKProduct] = []
-
-    for product in lpk_products:
-        sheet_products.append(
-            SheetLPKProduct(
-                sheet_id=SHEET_ID,
-                sheet_name=SHEET_NAME,
-                index=len(sheet_products) + 2,
-                category=category_dict[product.category_code].name
-                if product.category_code in category_dict
-                else "",
-                **(product.model_dump(mode="json")),
-                Note=formated_datetime(datetime.now()),
+        total_products += len(batch)
+
+        snapshots = {
+            product_row_key(row): ProductRowSnapshot(
+                index=index,
+                country_code=row[COUNTRY_CODE_POSITION],
+                hash=product_row_hash(row),
             )
+            for index, row in batch_rows.items()
+        }
+        snapshot_store.set_many(snapshots)
+        stale_keys.difference_update(snapshots)
+
+    snapshot_store.delete_many(list(stale_keys))
+    return total_products
+
+
+def write_changed_product_rows(
+    rows: Iterator[ProductRow],
+    snapshot_store: ModelKeyValueStore[ProductRowSnapshot],
+    fetched_country_codes: set[str],
+) -> int:
+    """
+    Write only the rows whose `HASH_FIELDS` changed since the last run.
+
+    Changed products are rewritten in place, new products are appended below
+    the last known row and products gone from a fetched country get
+    `REMOVED_STATUS`. Countries that failed to fetch are left as they are.
+
+    Returns:
+        int: Number of written rows.
+    """
+    snapshot = snapshot_store.get_many(snapshot_store.keys())
+    next_index = max((row.index for row in snapshot.values()), default=1) + 1
+    seen_keys: set[str] = set()
+
+    total_products = 0
+    pending_rows: dict[int, ProductRow] = {}
+    pending_snapshots: dict[str, ProductRowSnapshot] = {}
+
+    def flush() -> None:
+        if not pending_rows:
+            return
+
+        logger.info(f"Updating {len(pending_rows)} changed rows")
+        SheetLPKProduct.batch_update_rows(
+            sheet_id=SHEET_ID,
+            sheet_name=SHEET_NAME,
+            field_names=ROW_FIELDS,
+            rows=pending_rows,
         )
+        snapshot_store.set_many(pending_snapshots)
+        pending_rows.clear()
+        pending_snapshots.clear()
 
-    logger.info(f"Total valid product: {len(sheet_products)}")
+    for row in rows:
+        key = product_row_key(row)
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+
+        row_hash = product_row_hash(row)
+        previous = snapshot.get(key)
+        if previous is not None:
+            if previous.hash == row_hash and not previous.removed:
+                continue
+            index = previous.index
+        else:
+            index = next_index
+            next_index += 1
+
+        pending_rows[index] = row
+        pending_snapshots[key] = ProductRowSnapshot(
+            index=index,
+            country_code=row[COUNTRY_CODE_POSITION],
+            hash=row_hash,
+        )
+        total_products += 1
 
-    product_batchs = split_list(sheet_products, BATCH_SIZE)
-    logger.info("Sheet updating")
-    for i, batch in enumerate(product_batchs):
-        logger.info(f"Updating batch: {i + 1}")
-        SheetLPKProduct.batch_update(
+        if len(pending_rows) >= BATCH_SIZE:
+            flush()
+
+    flush()
+
+    removed_snapshots = {
+        key: row.model_copy(update={"removed": True})
+        for key, row in snapshot.items()
+        if key not in seen_keys
+        and not row.removed
+        and row.country_code in fetched_country_codes
+    }
+    if removed_snapshots:
+        logger.info(f"Marking {len(removed_snapshots)} removed products")
+        note = formated_datetime(datetime.now())
+        SheetLPKProduct.batch_update_rows(
             sheet_id=SHEET_ID,
             sheet_name=SHEET_NAME,
-            list_object=batch,
+            field_names=["status", "Note"],
+            rows={
+                row.index: (REMOVED_STATUS, note) for row in removed_snapshots.values()
+            },
+        )
+        snapshot_store.set_many(removed_snapshots)
+
+    return total_products
+
+
+def main(max_workers: int = FETCH_WORKERS, mode: SyncMode = "delta"):
+    # Bulk requests are held to the bulk Sheets budget, the rest of the quota
+    # stays with the server
+    with sheets_priority_scope(RequestPriority.BULK):
+        snapshot_store = get_catalog_snapshot_store()
+        if mode == "delta" and not snapshot_store.keys():
+            logger.info("No catalog snapshot, writing every product")
+            mode = "full"
+
+        country_categories = fetch_country_categories(
+            list(COUNTRY_CODES.keys()), max_workers=max_workers
+        )
+        # Countries without categories are skipped like failed ones
+        country_codes = [
+            country_code
+            for country_code in COUNTRY_CODES
+            if country_code in country_categories
+        ]
+        fetched_country_codes: set[str] = set()
+        rows = iter_product_rows(
+            fetch_country_products(country_codes, max_workers=max_workers),
+            country_categories,
+            fetched_country_codes,
         )
 
+        if mode == "full":
+            total_products = write_product_rows(rows, snapshot_store)
+        else:
+            total_products = write_changed_product_rows(
+                rows, snapshot_store, fetched_country_codes
+            )
+
+        logger.info(f"Total written product: {total_products}")
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Sync Lapakgaming catalog to sheet")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=FETCH_WORKERS,
+        help="Maximum number of Lapakgaming requests in flight, 1 fetches sequentially",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["full", "delta"],
+        default="delta",
+        help="full rewrites every product, delta only the changed ones",
+    )
+    args = parser.parse_args()
+
+    main(max_workers=args.workers, mode=args.mode)
@@ -1,12 +1,26 @@
-from typing import Final
+import argparse
+import asyncio
+
+from contextlib import aclosing
+from typing import Any, Awaitable, Callable, Final, Literal, TypeVar
+
+from pydantic import BaseModel
 
 from app import logger, config
+from app.paths import SRC_PATH
+from app.shared.enums import RequestPriority
+from app.shared.stores import ModelKeyValueStore
+from app.sheet.rate_limit import sheets_priority_scope
 
 from app.sheet.models import G2GTopUpProduct
-from app.g2g.api_client import g2g_api_client
+from app.g2g.api_client import AsyncG2GAPIClient
+from app.g2g.models import Brand, Product, AttributePayload
+from app.shared.rate_limit import AsyncTokenBucket
 
 from typing import TypedDict
 
+R = TypeVar("R")
+
 
 class Attribute(TypedDict):
     attribute_group_id: str
@@ -207,87 +221,422 @@ SERVICE_ID: Final[str] = "90015a0f-3983-4953-8368-96ac181d9e92"
 SHEET_ID: Final[str] = config.SHEET_ID
 SHEET_NAME: Final[str] = "G2GxLapak Mapping"
 
+# Columns filled by the crawler, the other columns are entered manually
+CATALOG_FIELDS: Final[list[str]] = [
+    "service_id",
+    "service_name",
+    "brand_id",
+    "brand_name",
+    "service_option",
+    "product_id",
+    "product_name",
+    "attribute_group_id",
+    "attribute_name",
+    "attribute_id",
+    "attribute_value",
+    "sub_attribute_id",
+    "sub_attribute_value",
+]
 
-def update_new_sheet_data():
-    logger.info("Getting brands of sevice: TOP UP")
+SyncMode = Literal["full", "incremental"]
 
-    brand_response = g2g_api_client.get_brand(service_id=SERVICE_ID)
-    brands = brand_response.payload.brand_list
-    logger.info(f"Total of TOP UP's brand: {len(brands)}")
 
-    item_count = 0
+class CatalogRowSnapshot(BaseModel):
+    index: int
+    fields: dict[str, str]
 
-    for brand in brands:
-        g2g_top_up_products: list[G2GTopUpProduct] = []
 
-        if brand.brand_id not in selling_brand_id:
-            continue
+class G2GCatalogCrawler:
+    """
+    Crawls brands, products and attributes of a G2G service concurrently.
+
+    At most `concurrency` requests are in flight, and each endpoint is
+    limited to `rate_limit` requests per second.
+    """
+
+    def __init__(
+        self,
+        api_client: AsyncG2GAPIClient,
+        concurrency: int,
+        rate_limit: float,
+    ) -> None:
+        self.api_client = api_client
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.rate_limiters = {
+            endpoint: AsyncTokenBucket(rate=rate_limit)
+            for endpoint in ("brands", "products", "attributes")
+        }
+
+    async def call(
+        self,
+        endpoint: str,
+        func: Callable[..., Awaitable[R]],
+        **kwargs: Any,
+    ) -> R:
+        async with self.semaphore:
+            await self.rate_limiters[endpoint].acquire()
+            return await func(**kwargs)
+
+    async def get_brands(self, service_id: str) -> list[Brand]:
+        brand_response = await self.call(
+            "brands", self.api_client.get_brand, service_id=service_id
+        )
+        return brand_response.payload.brand_list
 
+    async def crawl_brand(
+        self,
+        service_id: str,
+        brand: Brand,
+    ) -> list[tuple[Product, AttributePayload]]:
         logger.info(f"Getting {brand.brand_name}'s product")
-        product_response = g2g_api_client.get_product(
-            service_id=SERVICE_ID,
+        product_response = await self.call(
+            "products",
+            self.api_client.get_product,
+            service_id=service_id,
             brand_id=brand.brand_id,
         )
-
         products = product_response.payload.product_list
         logger.info(f"Total of {brand.brand_name}'s products: {len(products)}")
-        for product in products:
-            logger.info(f"Getting {product.product_name}'s attributes")
 
-            attribute_response = g2g_api_client.get_attribute(
-                product_id=product.product_id
+        attribute_responses = await asyncio.gather(
+            *(
+                self.call(
+                    "attributes",
+                    self.api_client.get_attribute,
+                    product_id=product.product_id,
+                )
+                for product in products
             )
+        )
+
+        return [
+            (product, attribute_response.payload)
+            for product, attribute_response in zip(products, attribute_responses)
+        ]
+
+
+def to_g2g_top_up_products(
+    brand: Brand,
+    product: Product,
+    attribute_payload: AttributePayload,
+    item_count: int,
+) -> list[G2GTopUpProduct]:
+    g2g_top_up_products: list[G2GTopUpProduct] = []
+
+    for attribute_group in attribute_payload.attribute_group_list:
+        for attribute in attribute_group.attribute_list:
+            sub_attributes = attribute.sub_attribute_list or [None]
+            for sub_attribute in sub_attributes:
+                row = item_count + len(g2g_top_up_products)
+                g2g_top_up_products.append(
+                    G2GTopUpProduct(
+                        sheet_id=SHEET_ID,
+                        sheet_name=SHEET_NAME,
+                        index=row + 2,
+                        STT=row + 1,
+                        service_id=SERVICE_ID,
+                        service_name="Top Up",
+                        brand_id=brand.brand_id,
+                        brand_name=brand.brand_name,
+                        service_option=attribute_group.attribute_group_name,
+                        product_id=product.product_id,
+                        product_name=product.product_name,
+                        attribute_group_id=attribute_group.attribute_group_id,
+                        attribute_name=attribute_group.attribute_group_name,
+                        attribute_id=attribute.attribute_id,
+                        attribute_value=attribute.attribute_name,
+                        sub_attribute_id=sub_attribute.attribute_id
+                        if sub_attribute
+                        else None,
+                        sub_attribute_value=sub_attribute.attribute_name
+                        if sub_attribute
+                        else None,
+                    )
+                )
+
+    return g2g_top_up_products
+
+
+def catalog_row_key(product: G2GTopUpProduct) -> str:
+    return "|".join(
+        [
+            product.product_id,
+            product.attribute_group_id,
+            product.attribute_id,
+            product.sub_attribute_id or "",
+        ]
+    )
 
-            for attribute_group in attribute_response.payload.attribute_group_list:
-                for attribute in attribute_group.attribute_list:
-                    if len(attribute.sub_attribute_list) > 0:
-                        for sub_attribute in attribute.sub_attribute_list:
-                            g2g_top_up_products.append(
-                                G2GTopUpProduct(
-                                    sheet_id=SHEET_ID,
-                                    sheet_name=SHEET_NAME,
-                                    index=item_count + 2,
-                                    STT=item_count + 1,
-                                    service_id=SERVICE_ID,
-                                    service_name="Top Up",
-                                    brand_id=brand.brand_id,
-                                    brand_name=brand.brand_name,
-                                    service_option=attribute_group.attribute_group_name,
-                                    product_id=product.product_id,
-                                    product_name=product.product_name,
-                                    attribute_group_id=attribute_group.attribute_group_id,
-                                    attribute_name=attribute_group.attribute_group_name,
-                                    attribute_id=attribute.attribute_id,
-                                    attribute_value=attribute.attribute_name,
-                                    sub_attribute_id=sub_attribute.attribute_id,
-                                    sub_attribute_value=sub_attribute.attribute_name,
-                                )
-                            )
-                            item_count += 1
-                    else:
-                        g2g_top_up_products.append(
-                            G2GTopUpProduct(
-                                sheet_id=SHEET_ID,
-                                sheet_name=SHEET_NAME,
-                                index=item_count + 2,
-                                STT=item_count + 1,
-                                service_id=SERVICE_ID,
-                                service_name="Top Up",
-                                brand_id=brand.brand_id,
-                                brand_name=brand.brand_name,
-                                service_option=attribute_group.attribute_group_name,
-                                product_id=product.product_id,
-                                product_name=product.product_name,
-                                attribute_group_id=attribute_group.attribute_group_id,
-                                attribute_name=attribute_group.attribute_group_name,
-                                attribute_id=attribute.attribute_id,
-                                attribute_value=attribute.attribute_name,
-                            )
-                        )
-                        item_count += 1
 
+def catalog_row_fields(product: G2GTopUpProduct) -> dict[str, str]:
+    model_dict = product.model_dump(include=set(CATALOG_FIELDS))
+    return {
+        field_name: ""
+        if model_dict[field_name] is None
+        else str(model_dict[field_name])
+        for field_name in CATALOG_FIELDS
+    }
+
+
+def get_catalog_snapshot_store() -> ModelKeyValueStore[CatalogRowSnapshot]:
+    return ModelKeyValueStore(
+        name="g2g_catalog_snapshot",
+        save_dir=SRC_PATH / "data" / "store",
+        model=CatalogRowSnapshot,
+        backend=config.KV_STORE_BACKEND,
+    )
+
+
+class FullCatalogWriter:
+    """
+    Rewrites every crawled row positionally, in crawl order.
+    """
+
+    def __init__(self, snapshot_store: ModelKeyValueStore[CatalogRowSnapshot]):
+        self.snapshot_store = snapshot_store
+        self.stale_keys: set[str] = set(snapshot_store.keys())
+        self.item_count = 0
+
+    def write_brand(
+        self,
+        brand: Brand,
+        crawled_products: list[tuple[Product, AttributePayload]],
+    ) -> None:
+        g2g_top_up_products: list[G2GTopUpProduct] = []
+        for product, attribute_payload in crawled_products:
+            g2g_top_up_products.extend(
+                to_g2g_top_up_products(
+                    brand,
+                    product,
+                    attribute_payload,
+                    self.item_count + len(g2g_top_up_products),
+                )
+            )
+        self.item_count += len(g2g_top_up_products)
+
+        logger.info(f"Writing {len(g2g_top_up_products)} rows of {brand.brand_name}")
         G2GTopUpProduct.batch_update(
             sheet_id=SHEET_ID,
             sheet_name=SHEET_NAME,
             list_object=g2g_top_up_products,
         )
+
+        snapshots = {
+            catalog_row_key(product): CatalogRowSnapshot(
+                index=product.index, fields=catalog_row_fields(product)
+            )
+            for product in g2g_top_up_products
+        }
+        self.snapshot_store.set_many(snapshots)
+        self.stale_keys.difference_update(snapshots)
+
+    def finish(self) -> None:
+        self.snapshot_store.delete_many(list(self.stale_keys))
+        logger.info(f"Total of TOP UP's rows: {self.item_count}")
+
+
+class IncrementalCatalogWriter:
+    """
+    Writes only the rows that changed since the previous crawl.
+
+    Rows are keyed by `catalog_row_key` and keep their sheet row across
+    syncs: changed rows are rewritten in place, new rows are appended below
+    the last known row and rows gone from G2G have their crawler columns
+    emptied. Manually entered columns are never written.
+    """
+
+    def __init__(self, snapshot_store: ModelKeyValueStore[CatalogRowSnapshot]):
+        self.snapshot_store = snapshot_store
+        self.snapshot: dict[str, CatalogRowSnapshot] = snapshot_store.get_many(
+            snapshot_store.keys()
+        )
+        if not self.snapshot:
+            self.snapshot = self.load_snapshot_from_sheet()
+            snapshot_store.set_many(self.snapshot)
+
+        # Rows that are not in the snapshot (invalid or manually entered
+        # ones) must not be overwritten by new rows
+        self.next_index = (
+            max(
+                max((row.index for row in self.snapshot.values()), default=1),
+                self.count_sheet_rows(),
+            )
+            + 1
+        )
+        self.seen_keys: set[str] = set()
+        self.written_count = 0
+
+    @staticmethod
+    def count_sheet_rows() -> int:
+        # Only the STT column and the manual ones, which stay filled on
+        # cleared rows, are read instead of the whole sheet
+        columns = [
+            col
+            for field_name, col in G2GTopUpProduct.mapping_fields().items()
+            if field_name not in CATALOG_FIELDS
+        ]
+        worksheet = G2GTopUpProduct.get_worksheet(
+            sheet_id=SHEET_ID, sheet_name=SHEET_NAME
+        )
+        value_ranges = worksheet.batch_get([f"{col}:{col}" for col in columns])
+        return max((len(value_range) for value_range in value_ranges), default=0)
+
+    @staticmethod
+    def load_snapshot_from_sheet() -> dict[str, CatalogRowSnapshot]:
+        logger.info("No catalog snapshot, loading it from sheet")
+        sheet_products, _, _ = G2GTopUpProduct.get_all_from_sheet(
+            sheet_id=SHEET_ID, sheet_name=SHEET_NAME, start_row=2
+        )
+        return {
+            catalog_row_key(product): CatalogRowSnapshot(
+                index=product.index, fields=catalog_row_fields(product)
+            )
+            for product in sheet_products
+            if product.product_id
+        }
+
+    def write_brand(
+        self,
+        brand: Brand,
+        crawled_products: list[tuple[Product, AttributePayload]],
+    ) -> None:
+        changed_rows: dict[int, list[Any]] = {}
+        changed_snapshots: dict[str, CatalogRowSnapshot] = {}
+
+        for product, attribute_payload in crawled_products:
+            for g2g_top_up_product in to_g2g_top_up_products(
+                brand, product, attribute_payload, 0
+            ):
+                key = catalog_row_key(g2g_top_up_product)
+                if key in self.seen_keys:
+                    continue
+                self.seen_keys.add(key)
+
+                fields = catalog_row_fields(g2g_top_up_product)
+                previous = self.snapshot.get(key)
+                if previous is not None:
+                    if previous.fields == fields:
+                        continue
+                    index = previous.index
+                else:
+                    index = self.next_index
+                    self.next_index += 1
+
+                # Empty strings clear fields that became None, manual
+                # columns are not part of the row
+                changed_rows[index] = [index - 1, *fields.values()]
+                changed_snapshots[key] = CatalogRowSnapshot(index=index, fields=fields)
+
+        if not changed_rows:
+            return
+
+        logger.info(f"Writing {len(changed_rows)} rows of {brand.brand_name}")
+        G2GTopUpProduct.batch_update_rows(
+            sheet_id=SHEET_ID,
+            sheet_name=SHEET_NAME,
+            field_names=["STT", *CATALOG_FIELDS],
+            rows=changed_rows,
+        )
+        self.snapshot.update(changed_snapshots)
+        self.snapshot_store.set_many(changed_snapshots)
+        self.written_count += len(changed_rows)
+
+    def finish(self) -> None:
+        removed_keys = [key for key in self.snapshot if key not in self.seen_keys]
+        if removed_keys:
+            logger.info(f"Clearing {len(removed_keys)} removed rows")
+            G2GTopUpProduct.batch_clear(
+                sheet_id=SHEET_ID,
+                sheet_name=SHEET_NAME,
+                indexes=[self.snapshot[key].index for key in removed_keys],
+                field_names=["STT", *CATALOG_FIELDS],
+            )
+            self.snapshot_store.delete_many(removed_keys)
+
+        logger.info(
+            f"Catalog synced: {self.written_count} rows written, {len(removed_keys)} rows removed"
+        )
+
+
+async def update_new_sheet_data_async(
+    mode: SyncMode = "incremental",
+    concurrency: int = config.G2G_CRAWLER_CONCURRENCY,
+    rate_limit: float = config.G2G_CRAWLER_RATE_LIMIT,
+) -> None:
+    snapshot_store = get_catalog_snapshot_store()
+    writer = (
+        FullCatalogWriter(snapshot_store)
+        if mode == "full"
+        else IncrementalCatalogWriter(snapshot_store)
+    )
+
+    # Own client, the shared one belongs to the server lifespan
+    async with aclosing(AsyncG2GAPIClient()) as api_client:
+        crawler = G2GCatalogCrawler(
+            api_client, concurrency=concurrency, rate_limit=rate_limit
+        )
+
+        logger.info("Getting brands of sevice: TOP UP")
+        brands = await crawler.get_brands(service_id=SERVICE_ID)
+        logger.info(f"Total of TOP UP's brand: {len(brands)}")
+
+        selling_brands = [
+            brand for brand in brands if brand.brand_id in selling_brand_id
+        ]
+
+        async with asyncio.TaskGroup() as task_group:
+            brand_tasks = [
+                task_group.create_task(crawler.crawl_brand(SERVICE_ID, brand))
+                for brand in selling_brands
+            ]
+
+            # Brands are crawled concurrently but written in order, so every
+            # brand is streamed to the sheet as soon as it and the brands
+            # before it are done
+            for brand, brand_task in zip(selling_brands, brand_tasks):
+                await asyncio.to_thread(writer.write_brand, brand, await brand_task)
+
+    # Only reached after a complete crawl, a failed one never clears rows
+    await asyncio.to_thread(writer.finish)
+
+
+def update_new_sheet_data(
+    mode: SyncMode = "incremental",
+    concurrency: int = config.G2G_CRAWLER_CONCURRENCY,
+    rate_limit: float = config.G2G_CRAWLER_RATE_LIMIT,
+) -> None:
+    # Bulk requests are held to the bulk Sheets budget, the rest of the quota
+    # stays with the server
+    with sheets_priority_scope(RequestPriority.BULK):
+        asyncio.run(
+            update_new_sheet_data_async(
+                mode=mode, concurrency=concurrency, rate_limit=rate_limit
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync G2G Top Up catalog to sheet")
+    parser.add_argument(
+        "--mode",
+        choices=["full", "incremental"],
+        default="incremental",
+        help="full rewrites every row, incremental only the changed ones",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=config.G2G_CRAWLER_CONCURRENCY,
+        help="Maximum number of G2G requests in flight",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=config.G2G_CRAWLER_RATE_LIMIT,
+        help="Requests per second for each G2G endpoint",
+    )
+    args = parser.parse_args()
+
+    update_new_sheet_data(
+        mode=args.mode, concurrency=args.concurrency, rate_limit=args.rate_limit
+    )
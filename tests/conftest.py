@@ -0,0 +1,33 @@
+import os
+
+import gspread
+
+from google.auth.credentials import AnonymousCredentials
+from gspread.http_client import HTTPClient
+
+# Settings required by `app.config`, set before any test imports `app`
+for name in (
+    "APP_TITLE",
+    "KEYS_PATH",
+    "SHEET_ID",
+    "SHEET_NAME",
+    "MAPPING_SHEET_NAME",
+    "LOG_SHEET_ID",
+    "LOG_SHEET_NAME",
+    "G2G_ACCOUNT_ID",
+    "G2G_API_KEY",
+    "G2G_SECRET_KEY",
+    "G2G_WEBHOOOK_SECRET_TOKEN",
+    "G2G_WEBHOOK_URL",
+    "LAPAK_API_KEY",
+    "ALITEDIAS_API_KEY",
+):
+    os.environ.setdefault(name, "test")
+
+
+def service_account(filename, scopes=None, http_client=HTTPClient) -> gspread.Client:
+    # Tests never reach the Sheets API, no key file is needed
+    return gspread.Client(auth=AnonymousCredentials(), http_client=http_client)
+
+
+gspread.service_account = service_account
@@ -0,0 +1,129 @@
+import json
+import os
+import random
+
+import pytest
+
+from app.paths import DATA_PATH
+from app.server.routes.g2g.delivery_mapping import (
+    DEFAULT_KEY,
+    CompiledDeliveryMapping,
+    DeliveryMappingCache,
+)
+from app.server.routes.g2g.models import AttributeItem
+
+MAPPING_FILES = [
+    "lapak_delivery_method_list_mapping.json",
+    "eli_delivery_method_list_mapping.json",
+]
+
+
+def legacy_map_delivery_method_list(
+    delivery_method_list: list[AttributeItem],
+    product_delivery_method_list_mapping: dict,
+) -> dict:
+    # The per-order scan the compiled mapping replaced
+    mapping_payload: dict = {}
+    for delivery_method in delivery_method_list:
+        for (
+            payload_key,
+            map_attribute_group_id,
+        ) in product_delivery_method_list_mapping.items():
+            if isinstance(map_attribute_group_id, str):
+                if delivery_method.attribute_group_id == map_attribute_group_id:
+                    mapping_payload[payload_key] = (
+                        delivery_method.value or delivery_method.attribute_value
+                    )
+            if isinstance(map_attribute_group_id, dict):
+                for attribute_group_id, value_mapping in map_attribute_group_id.items():
+                    if DEFAULT_KEY == attribute_group_id:
+                        mapping_payload[payload_key] = value_mapping
+                    if delivery_method.attribute_group_id == attribute_group_id:
+                        if delivery_method.value in value_mapping:
+                            mapping_payload[payload_key] = value_mapping[
+                                delivery_method.value
+                            ]
+                        elif delivery_method.attribute_value in value_mapping:
+                            mapping_payload[payload_key] = value_mapping[
+                                delivery_method.attribute_value
+                            ]
+    return mapping_payload
+
+
+def attribute_item(attribute_group_id: str, value=None, attribute_value=None):
+    return AttributeItem(
+        attribute_group_id=attribute_group_id,
+        attribute_group_name="name",
+        value=value,
+        attribute_value=attribute_value,
+    )
+
+
+@pytest.mark.parametrize("file_name", MAPPING_FILES)
+def test_matches_legacy_mapping_on_shipped_files(file_name):
+    with open(DATA_PATH / file_name) as f:
+        mappings: dict[str, dict] = json.load(f)
+
+    generator = random.Random(0)
+    for product_mapping in mappings.values():
+        group_ids = ["unknown"]
+        values: list[str | None] = [None, "unknown"]
+        for map_attribute_group_id in product_mapping.values():
+            if isinstance(map_attribute_group_id, str):
+                group_ids.append(map_attribute_group_id)
+                continue
+            for attribute_group_id, value_mapping in map_attribute_group_id.items():
+                if attribute_group_id != DEFAULT_KEY:
+                    group_ids.append(attribute_group_id)
+                    values.extend(value_mapping)
+
+        compiled = CompiledDeliveryMapping(product_mapping)
+        for _ in range(20):
+            delivery_method_list = [
+                attribute_item(
+                    generator.choice(group_ids),
+                    value=generator.choice(values),
+                    attribute_value=generator.choice(values),
+                )
+                for _ in range(generator.randint(0, 3))
+            ]
+            assert compiled.resolve(delivery_method_list) == (
+                legacy_map_delivery_method_list(delivery_method_list, product_mapping)
+            )
+
+
+def test_default_is_a_fallback():
+    compiled = CompiledDeliveryMapping(
+        {
+            "user_id": "g-user",
+            "server": {DEFAULT_KEY: "asia", "g-server": {"EU": "europe"}},
+        }
+    )
+
+    assert compiled.resolve([]) == {}
+    assert compiled.resolve([attribute_item("g-user", attribute_value="42")]) == {
+        "user_id": "42",
+        "server": "asia",
+    }
+    assert compiled.resolve(
+        [attribute_item("g-server", value="EU"), attribute_item("g-user", value="7")]
+    ) == {"user_id": "7", "server": "europe"}
+
+
+def test_cache_recompiles_on_mtime_change(tmp_path):
+    mapping_file = tmp_path / "mapping.json"
+    mapping_file.write_text(json.dumps({"p1": {"user_id": "g-user"}}))
+    cache = DeliveryMappingCache(mapping_file)
+
+    mappings = cache.get()
+    assert list(mappings) == ["p1"]
+    assert cache.get() is mappings
+
+    mapping_file.write_text(json.dumps({"p2": {"user_id": "g-user"}}))
+    os.utime(mapping_file, ns=(0, mapping_file.stat().st_mtime_ns + 10**9))
+    assert list(cache.get()) == ["p2"]
+
+    # A broken file keeps the previous mappings
+    mapping_file.write_text("{")
+    os.utime(mapping_file, ns=(0, mapping_file.stat().st_mtime_ns + 2 * 10**9))
+    assert list(cache.get()) == ["p2"]
@@ -0,0 +1,68 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.elite import utils
+from app.elite.api_client import elitedias_api_client
+from app.elite.models import CreateTopUpResponse
+
+REQUEST = httpx.Request("POST", "https://elitedias.test/topup")
+
+
+def status_error(status_code: int) -> httpx.HTTPStatusError:
+    return httpx.HTTPStatusError(
+        "error", request=REQUEST, response=httpx.Response(status_code, request=REQUEST)
+    )
+
+
+def run_topups(monkeypatch, outcomes: list, quantity: int):
+    calls = []
+
+    async def create_topup(payload: dict) -> CreateTopUpResponse:
+        outcome = outcomes[len(calls)]
+        calls.append(payload)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(elitedias_api_client, "create_topup", create_topup)
+    result = asyncio.run(
+        utils.create_topups({"game": "g"}, quantity=quantity, retry_interval=0)
+    )
+    return result, len(calls)
+
+
+def created(order_id: str) -> CreateTopUpResponse:
+    return CreateTopUpResponse(status="success", order_id=order_id)
+
+
+@pytest.mark.parametrize(
+    "failure",
+    [
+        httpx.ConnectError("refused"),
+        status_error(400),
+        CreateTopUpResponse(status="failed", message="out of stock"),
+    ],
+)
+def test_rejected_topup_is_retried(monkeypatch, failure):
+    (order_ids, failed_reason), call_count = run_topups(
+        monkeypatch, [created("1"), failure, created("2")], quantity=2
+    )
+
+    assert sorted(order_ids) == ["1", "2"]
+    assert call_count == 3
+
+
+@pytest.mark.parametrize(
+    "failure",
+    [httpx.ReadTimeout("timed out", request=REQUEST), status_error(502)],
+)
+def test_ambiguous_topup_is_not_retried(monkeypatch, failure):
+    (order_ids, failed_reason), call_count = run_topups(
+        monkeypatch, [created("1"), failure], quantity=2
+    )
+
+    assert order_ids == ["1"]
+    assert call_count == 2
+    assert failed_reason.startswith("1 top-up(s) may have been created")
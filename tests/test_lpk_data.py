@@ -0,0 +1,163 @@
+import threading
+
+from typing import Any
+from types import SimpleNamespace
+
+import lpk_data
+
+from app.lpk import utils as lpk_utils
+from app.lpk.models import Category, Product
+from app.shared.stores import ModelKeyValueStore
+from app.sheet.models import LPKProduct as SheetLPKProduct
+
+
+def product(code: str, category_code: str, country_code: str, **fields: Any) -> Product:
+    return Product(
+        **{
+            "code": code,
+            "category_code": category_code,
+            "name": code,
+            "provider_code": "p",
+            "price": 1,
+            "process_time": 1,
+            "country_code": country_code,
+            "status": "active",
+            **fields,
+        }
+    )
+
+
+def product_row(
+    code: str, country_code: str = "id", **fields: Any
+) -> lpk_data.ProductRow:
+    return lpk_data.to_product_row(
+        product(code, "c", country_code, **fields), "category", "note"
+    )
+
+
+def test_rows_resolve_categories_of_every_country():
+    # The "id" product uses a category only "sg" lists
+    country_categories = {
+        "id": [],
+        "sg": [Category.model_construct(code="cat-sg", name="SG category")],
+    }
+    country_products = [
+        ("id", [product("a", "cat-sg", "id")]),
+        ("sg", [product("b", "cat-sg", "sg")]),
+    ]
+    fetched_country_codes: set[str] = set()
+
+    rows = list(
+        lpk_data.iter_product_rows(
+            iter(country_products), country_categories, fetched_country_codes
+        )
+    )
+
+    assert [row[0] for row in rows] == ["a", "b"]
+    assert [row[2] for row in rows] == ["SG category", "SG category"]
+    assert fetched_country_codes == {"id", "sg"}
+
+
+def test_countries_are_streamed_in_order(monkeypatch):
+    release_id = threading.Event()
+    id_done = threading.Event()
+    my_done = threading.Event()
+
+    def get_all_products(country_code: str):
+        if country_code == "id":
+            try:
+                assert release_id.wait(timeout=5)
+            finally:
+                id_done.set()
+        if country_code == "th":
+            raise ConnectionError("down")
+        if country_code == "my":
+            my_done.set()
+        return SimpleNamespace(
+            data=SimpleNamespace(products=[product(country_code, "c", country_code)])
+        )
+
+    monkeypatch.setattr(lpk_utils.lpk_api_client, "get_all_products", get_all_products)
+
+    country_products = lpk_utils.fetch_country_products(
+        ["sg", "id", "th", "my"], max_workers=4
+    )
+
+    # "sg" comes out while "id" is still being fetched
+    assert next(country_products)[0] == "sg"
+    assert not id_done.is_set()
+
+    # "my" finished early and is held back behind "id", "th" failed
+    assert my_done.wait(timeout=5)
+    release_id.set()
+    assert [country_code for country_code, _ in country_products] == ["id", "my"]
+
+
+def test_delta_mode_writes_only_changed_rows(tmp_path, monkeypatch):
+    writes: list[tuple[list[str], dict[int, Any]]] = []
+    monkeypatch.setattr(
+        SheetLPKProduct,
+        "batch_update_rows",
+        lambda sheet_id, sheet_name, field_names, rows: writes.append(
+            (field_names, dict(rows))
+        ),
+    )
+    snapshot_store = ModelKeyValueStore(
+        name="snapshot", save_dir=tmp_path, model=lpk_data.ProductRowSnapshot
+    )
+
+    def snapshot(index: int, row: lpk_data.ProductRow, **fields: Any):
+        return lpk_data.ProductRowSnapshot(
+            index=index,
+            country_code=row[lpk_data.COUNTRY_CODE_POSITION],
+            hash=lpk_data.product_row_hash(row),
+            **fields,
+        )
+
+    snapshot_store.set_many(
+        {
+            "id|price": snapshot(2, product_row("price")),
+            "id|status": snapshot(3, product_row("status")),
+            "id|time": snapshot(4, product_row("time")),
+            "id|name": snapshot(5, product_row("name")),
+            "id|same": snapshot(6, product_row("same")),
+            "id|gone": snapshot(7, product_row("gone")),
+            "id|removed": snapshot(8, product_row("removed"), removed=True),
+            "sg|failed": snapshot(9, product_row("failed", "sg")),
+        }
+    )
+    rows = [
+        product_row("price", price=2),
+        product_row("status", status="inactive"),
+        product_row("time", process_time=5),
+        product_row("name", name="renamed"),
+        # Fields outside HASH_FIELDS do not make a row rewritten
+        product_row("same", provider_code="other"),
+        product_row("new"),
+    ]
+
+    total_products = lpk_data.write_changed_product_rows(
+        iter(rows), snapshot_store, fetched_country_codes={"id"}
+    )
+
+    assert total_products == 5
+    (field_names, changed_rows), (removed_field_names, removed_rows) = writes
+    assert field_names == lpk_data.ROW_FIELDS
+    assert changed_rows == {
+        2: rows[0],
+        3: rows[1],
+        4: rows[2],
+        5: rows[3],
+        # Appended below the last known row
+        10: rows[5],
+    }
+    # Rows of "sg", which failed to fetch, and already removed rows are left
+    assert removed_field_names == ["status", "Note"]
+    assert list(removed_rows) == [7]
+    assert removed_rows[7][0] == lpk_data.REMOVED_STATUS
+
+    snapshot = snapshot_store.get_many(snapshot_store.keys())
+    assert snapshot["id|gone"].removed
+    assert not snapshot["sg|failed"].removed
+    assert snapshot["id|new"].index == 10
+    assert snapshot["id|price"].hash == lpk_data.product_row_hash(rows[0])
@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+from types import SimpleNamespace
+
+from app.g2g.api_client import AsyncG2GAPIClient
+from app.g2g.offer_cache import OfferCache
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_hit_and_concurrent_misses_share_one_load():
+    async def main():
+        cache = OfferCache(ttl=60, max_size=10)
+        loads: list[str] = []
+
+        async def loader(offer_id: str):
+            loads.append(offer_id)
+            await asyncio.sleep(0.01)
+            return f"{offer_id}-v1"
+
+        results = await asyncio.gather(*(cache.get("o1", loader) for _ in range(3)))
+        assert results == ["o1-v1"] * 3
+        assert await cache.get("o1", loader) == "o1-v1"
+        assert loads == ["o1"]
+
+    run(main())
+
+
+def test_load_in_flight_during_invalidate_is_not_stored():
+    async def main():
+        cache = OfferCache(ttl=60, max_size=10)
+        release = asyncio.Event()
+        versions = iter(["old", "new"])
+
+        async def loader(offer_id: str):
+            version = next(versions)
+            if version == "old":
+                await release.wait()
+            return version
+
+        stale_read = asyncio.create_task(cache.get("o1", loader))
+        await asyncio.sleep(0)
+        cache.invalidate("o1")
+        release.set()
+
+        assert await stale_read == "old"
+        assert await cache.get("o1", loader) == "new"
+        # No per-offer state outlives its load
+        assert cache._inflight == {}
+
+    run(main())
+
+
+def test_read_during_delete_does_not_cache_old_offer():
+    async def main():
+        api_client = AsyncG2GAPIClient()
+        offer_state = {"offer": "old"}
+
+        async def get_offer(offer_id: str):
+            return offer_state["offer"]
+
+        async def request(method: str, canonical_url: str, **kwargs):
+            # A delivery reads the offer while the write is in flight
+            assert await api_client.get_cached_offer("write-race") == "old"
+            offer_state["offer"] = "new"
+            return SimpleNamespace(
+                json=lambda: {
+                    "request_id": "r",
+                    "code": 2000,
+                    "message": "ok",
+                    "warning": "",
+                    "payload": {"success": True},
+                }
+            )
+
+        api_client.get_offer = get_offer
+        api_client.request = request
+
+        await api_client.delete_offer("write-race")
+        assert await api_client.get_cached_offer("write-race") == "new"
+
+        await api_client.aclose()
+
+    run(main())
+
+
+def test_hit_past_refresh_ahead_reloads_in_background():
+    async def main():
+        cache = OfferCache(ttl=60, max_size=10, refresh_ahead=0.8)
+        versions = iter(["v1", "v2"])
+
+        async def loader(offer_id: str):
+            return next(versions)
+
+        assert await cache.get("o1", loader) == "v1"
+        loaded_at, offer = cache._entries["o1"]
+        cache._entries["o1"] = (loaded_at - 50, offer)
+
+        # The cached offer is served while the reload runs
+        assert await cache.get("o1", loader) == "v1"
+        reload = cache._inflight["o1"]
+        assert await reload == "v2"
+        assert await cache.get("o1", loader) == "v2"
+        assert time.monotonic() - cache._entries["o1"][0] < 1
+
+    run(main())
+
+
+def test_lru_evicts_least_recently_used():
+    async def main():
+        cache = OfferCache(ttl=60, max_size=2)
+
+        async def loader(offer_id: str):
+            return offer_id
+
+        for offer_id in ("a", "b", "a", "c"):
+            await cache.get(offer_id, loader)
+
+        assert list(cache._entries) == ["a", "c"]
+
+    run(main())
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from google.auth.credentials import AnonymousCredentials
+from gspread.http_client import HTTPClient
+
+from app.sheet import rate_limit as sheet_rate_limit
+from app.shared.enums import RequestPriority
+from app.shared.rate_limit import PriorityTokenBucket
+
+
+def wait_for_depth(bucket: PriorityTokenBucket, depth: dict[int, int]) -> None:
+    deadline = time.monotonic() + 1
+    while bucket.queue_depth() != depth:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_burst_is_served_without_waiting():
+    bucket = PriorityTokenBucket(rate=1, capacity=5)
+
+    started_at = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+
+    assert time.monotonic() - started_at < 0.1
+
+
+def test_higher_priority_is_served_first():
+    bucket = PriorityTokenBucket(rate=5, capacity=1)
+    bucket.acquire()
+    served: list[RequestPriority] = []
+
+    def acquire(priority: RequestPriority) -> None:
+        bucket.acquire(priority.value)
+        served.append(priority)
+
+    bulk = threading.Thread(target=acquire, args=(RequestPriority.BULK,))
+    bulk.start()
+    wait_for_depth(bucket, {RequestPriority.BULK.value: 1})
+
+    order = threading.Thread(target=acquire, args=(RequestPriority.ORDER,))
+    order.start()
+    wait_for_depth(
+        bucket, {RequestPriority.BULK.value: 1, RequestPriority.ORDER.value: 1}
+    )
+
+    bulk.join()
+    order.join()
+    assert served == [RequestPriority.ORDER, RequestPriority.BULK]
+    assert bucket.queue_depth() == {}
+
+
+def test_bulk_requests_take_the_bulk_budget(monkeypatch):
+    acquired: list[tuple[str, int]] = []
+
+    class FakeBucket:
+        def __init__(self, name: str) -> None:
+            self.name = name
+
+        def acquire(self, priority: int = 0) -> None:
+            acquired.append((self.name, priority))
+
+    for name in (
+        "sheets_read_bucket",
+        "sheets_write_bucket",
+        "sheets_bulk_read_bucket",
+        "sheets_bulk_write_bucket",
+    ):
+        monkeypatch.setattr(sheet_rate_limit, name, FakeBucket(name))
+    monkeypatch.setattr(HTTPClient, "request", lambda *args, **kwargs: None)
+    client = sheet_rate_limit.RateLimitedHTTPClient(auth=AnonymousCredentials())
+
+    client.request("get", "values")
+    with sheet_rate_limit.sheets_priority_scope(RequestPriority.BULK):
+        client.request("post", "values:batchUpdate")
+
+    assert acquired == [
+        ("sheets_read_bucket", RequestPriority.DEFAULT.value),
+        ("sheets_bulk_write_bucket", 0),
+        ("sheets_write_bucket", RequestPriority.BULK.value),
+    ]
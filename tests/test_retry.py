@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.shared import retry as retry_module
+from app.shared.enums import CircuitState, Upstream
+from app.shared.retry import CircuitBreaker, CircuitOpenError, async_retry, retry
+
+UPSTREAM = Upstream.G2G
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker(UPSTREAM, failure_threshold=2, reset_timeout=0.05)
+    monkeypatch.setitem(retry_module.circuit_breakers, UPSTREAM, breaker)
+    return breaker
+
+
+def test_breaker_state_transitions(breaker):
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    # One trial call only
+    assert breaker.allow()
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.failures == 0
+
+
+def test_retry_opens_circuit_and_fails_fast(breaker):
+    calls = []
+
+    @retry(UPSTREAM, max_retries=3, base_delay=0)
+    def call():
+        calls.append(1)
+        raise httpx.ConnectError("down")
+
+    # The circuit opens after two failures, the third attempt never runs
+    with pytest.raises(CircuitOpenError):
+        call()
+    assert breaker.state == CircuitState.OPEN
+    assert len(calls) == 2
+
+    with pytest.raises(CircuitOpenError):
+        call()
+    assert len(calls) == 2
+
+
+def test_non_retryable_error_is_not_retried(breaker):
+    calls = []
+
+    @retry(UPSTREAM, max_retries=3, base_delay=0)
+    def call():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        call()
+    assert len(calls) == 1
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_cancelled_trial_releases_half_open_circuit(breaker):
+    async def main():
+        started = asyncio.Event()
+
+        @async_retry(UPSTREAM, max_retries=0)
+        async def hang():
+            started.set()
+            await asyncio.Event().wait()
+
+        @async_retry(UPSTREAM, max_retries=0)
+        async def ok():
+            return "ok"
+
+        breaker.record_failure()
+        breaker.record_failure()
+        await asyncio.sleep(0.06)
+
+        trial = asyncio.create_task(hang())
+        await started.wait()
+        assert breaker.state == CircuitState.HALF_OPEN
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        assert breaker.state == CircuitState.OPEN
+        await asyncio.sleep(0.06)
+        assert await ok() == "ok"
+        assert breaker.state == CircuitState.CLOSED
+
+    asyncio.run(main())
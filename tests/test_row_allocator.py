@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.sheet import row_allocator
+from app.sheet.row_allocator import RowAllocator
+
+
+class FakeWorksheet:
+    def __init__(self, columns: dict[int, list[str]]) -> None:
+        # Column index -> values from row 1 on
+        self.columns = columns
+
+    def col_values(self, col: int) -> list[str]:
+        return self.columns.get(col, [])
+
+    def get(self, a1_range: str) -> list[list[str]]:
+        start, end = a1_range.split(":")
+        first_row, last_row = int(start[1:]), int(end[1:])
+        values = self.columns.get(1, [])[first_row - 1 : last_row]
+        return [[value] if value else [] for value in values]
+
+
+@pytest.fixture
+def worksheet(monkeypatch):
+    worksheet = FakeWorksheet({1: ["time", "t1", "t2"], 2: ["id", "a", "b", "c"]})
+    monkeypatch.setattr(
+        row_allocator.worksheet_cache, "get", lambda sheet_id, sheet_name: worksheet
+    )
+    return worksheet
+
+
+def test_bootstrap_counts_the_configured_column(tmp_path, worksheet):
+    allocator = RowAllocator("rows", tmp_path, "sheet", "log", column="B")
+
+    assert allocator.allocate() == 5
+
+
+def test_concurrent_allocations_are_unique(tmp_path, worksheet):
+    allocator = RowAllocator("rows", tmp_path, "sheet", "log")
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        rows = list(executor.map(lambda _: allocator.allocate(), range(100)))
+
+    assert sorted(rows) == list(range(4, 104))
+    # A second process sharing the mark continues after it
+    assert RowAllocator("rows", tmp_path, "sheet", "log").allocate() == 104
+
+
+def test_reconcile_skips_rows_written_elsewhere(tmp_path, worksheet):
+    allocator = RowAllocator("rows", tmp_path, "sheet", "log", window=2)
+    assert allocator.allocate() == 4
+
+    worksheet.columns[1] += ["t3", "t4", "t5", "t6"]
+    assert allocator.peek() == 8
+    # Peeking persists nothing
+    assert allocator.read_next_row() == 5
+
+    assert allocator.reconcile() == 8
+    assert allocator.allocate() == 8
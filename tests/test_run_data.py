@@ -0,0 +1,199 @@
+import pytest
+from gspread.utils import a1_range_to_grid_range, column_letter_to_index
+
+import run_data
+
+from app.g2g.models import Attribute, AttributeGroup, AttributePayload, Brand, Product
+from app.shared.stores import ModelKeyValueStore
+from app.sheet import models
+from app.sheet.models import G2GTopUpProduct
+
+BRAND = Brand(brand_id="b1", brand_name="Brand")
+MANUAL_VALUES = {
+    "lapak_codes": "LPK",
+    "eli_game": "ELI",
+    "eli_denomination": "100",
+    "provider_mode": "lapak",
+}
+
+
+class FakeSheet:
+    """
+    Cells of the mapping sheet, serving the worksheet and values API calls.
+    """
+
+    def __init__(self) -> None:
+        # (row, col) -> value, both 1-based
+        self.cells: dict[tuple[int, int], str] = {}
+        self.write_count = 0
+
+    def read(self, a1_range: str) -> list[list[str]]:
+        grid_range = a1_range_to_grid_range(a1_range.split("!")[-1])
+        first_row = grid_range.get("startRowIndex", 0) + 1
+        first_col = grid_range.get("startColumnIndex", 0) + 1
+        last_col = grid_range["endColumnIndex"]
+        last_row = grid_range.get(
+            "endRowIndex", max((row for row, _ in self.cells), default=0)
+        )
+
+        values = [
+            [self.cells.get((row, col), "") for col in range(first_col, last_col + 1)]
+            for row in range(first_row, last_row + 1)
+        ]
+        # The API omits trailing empty rows and cells
+        while values and not any(values[-1]):
+            values.pop()
+        return [
+            row[: max((i + 1 for i, value in enumerate(row) if value), default=0)]
+            for row in values
+        ]
+
+    def batch_get(self, ranges: list[str]) -> list[list[list[str]]]:
+        return [self.read(a1_range) for a1_range in ranges]
+
+    def values_batch_get(self, id: str, ranges: list[str]) -> dict:
+        return {"valueRanges": [{"values": self.read(r)} for r in ranges]}
+
+    def batch_update(self, data: list[dict], value_input_option=None) -> None:
+        self.write_count += 1
+        for entry in data:
+            grid_range = a1_range_to_grid_range(entry["range"])
+            for row_offset, values in enumerate(entry["values"]):
+                for col_offset, value in enumerate(values):
+                    # None leaves the cell untouched, like the Sheets API
+                    if value is not None:
+                        cell = (
+                            grid_range["startRowIndex"] + 1 + row_offset,
+                            grid_range["startColumnIndex"] + 1 + col_offset,
+                        )
+                        self.cells[cell] = str(value)
+
+    def set_row(self, index: int, values: dict[str, str]) -> None:
+        for field_name, value in values.items():
+            col = G2GTopUpProduct.column_schema.read_columns[field_name]
+            self.cells[(index, column_letter_to_index(col))] = value
+
+    def row(self, index: int) -> dict[str, str]:
+        return {
+            field_name: self.cells.get((index, column_letter_to_index(col)), "")
+            for field_name, col in G2GTopUpProduct.column_schema.read_columns.items()
+        }
+
+
+@pytest.fixture
+def sheet(monkeypatch):
+    sheet = FakeSheet()
+    monkeypatch.setattr(
+        G2GTopUpProduct, "get_worksheet", lambda sheet_id, sheet_name: sheet
+    )
+    monkeypatch.setattr(models.gsheet_client, "http_client", sheet)
+    return sheet
+
+
+@pytest.fixture
+def snapshot_store(tmp_path):
+    return ModelKeyValueStore(
+        name="snapshot", save_dir=tmp_path, model=run_data.CatalogRowSnapshot
+    )
+
+
+def crawled_product(
+    attributes: dict[str, str],
+) -> tuple[Product, AttributePayload]:
+    product = Product.model_construct(product_id="p1", product_name="Gems")
+    attribute_group = AttributeGroup.model_construct(
+        attribute_group_id="g1",
+        attribute_group_name="Amount",
+        attribute_list=[
+            Attribute(
+                attribute_id=attribute_id,
+                attribute_name=attribute_name,
+                sub_attribute_list=[],
+            )
+            for attribute_id, attribute_name in attributes.items()
+        ],
+    )
+    return product, AttributePayload.model_construct(
+        product_id="p1", attribute_group_list=[attribute_group]
+    )
+
+
+def snapshot_indexes(
+    snapshot_store: ModelKeyValueStore[run_data.CatalogRowSnapshot],
+) -> dict[str, int]:
+    snapshot = snapshot_store.get_many(snapshot_store.keys())
+    return {key: row.index for key, row in snapshot.items()}
+
+
+def write_catalog(sheet: FakeSheet, attributes: dict[str, str]) -> None:
+    # Catalog rows from row 2 on, with manually filled columns
+    for offset, product in enumerate(
+        run_data.to_g2g_top_up_products(BRAND, *crawled_product(attributes), 0)
+    ):
+        sheet.set_row(
+            offset + 2,
+            {"STT": str(offset + 1), **run_data.catalog_row_fields(product)},
+        )
+        sheet.set_row(offset + 2, MANUAL_VALUES)
+    sheet.set_row(1, {"STT": "STT"})
+
+
+def test_snapshot_is_bootstrapped_from_sheet(sheet, snapshot_store):
+    write_catalog(sheet, {"a1": "100 Gems", "a2": "200 Gems"})
+
+    writer = run_data.IncrementalCatalogWriter(snapshot_store)
+
+    assert snapshot_indexes(snapshot_store) == {
+        "p1|g1|a1|": 2,
+        "p1|g1|a2|": 3,
+    }
+    assert writer.next_index == 4
+    # Unchanged rows are not written again
+    writer.write_brand(BRAND, [crawled_product({"a1": "100 Gems", "a2": "200 Gems"})])
+    writer.finish()
+    assert sheet.write_count == 0
+
+
+def test_rows_are_updated_appended_and_cleared(sheet, snapshot_store):
+    write_catalog(sheet, {"a1": "100 Gems", "a2": "200 Gems", "a3": "300 Gems"})
+    writer = run_data.IncrementalCatalogWriter(snapshot_store)
+
+    writer.write_brand(
+        BRAND, [crawled_product({"a1": "110 Gems", "a3": "300 Gems", "a4": "400 Gems"})]
+    )
+    writer.finish()
+
+    # Changed in place
+    assert sheet.row(2)["attribute_value"] == "110 Gems"
+    # Gone from G2G, only the crawler columns are emptied
+    assert sheet.row(3) == {
+        field_name: MANUAL_VALUES.get(field_name, "")
+        for field_name in G2GTopUpProduct.column_schema.read_columns
+    }
+    # Appended below the last row
+    assert sheet.row(5)["STT"] == "4"
+    assert sheet.row(5)["attribute_id"] == "a4"
+    for index in (2, 4):
+        row = sheet.row(index)
+        assert {field_name: row[field_name] for field_name in MANUAL_VALUES} == (
+            MANUAL_VALUES
+        )
+
+    assert snapshot_indexes(snapshot_store) == {
+        "p1|g1|a1|": 2,
+        "p1|g1|a3|": 4,
+        "p1|g1|a4|": 5,
+    }
+
+
+def test_new_rows_skip_cleared_and_manual_rows(sheet, snapshot_store):
+    snapshot_store.set(
+        "p|g|a|", run_data.CatalogRowSnapshot(index=2, fields={"product_id": "p"})
+    )
+    # Row 3 is not in the snapshot, row 5 only has manual columns left
+    sheet.set_row(3, {"STT": "x"})
+    sheet.set_row(5, {"lapak_codes": "LPK"})
+
+    writer = run_data.IncrementalCatalogWriter(snapshot_store)
+
+    assert writer.next_index == 6
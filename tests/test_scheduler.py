@@ -0,0 +1,92 @@
+import asyncio
+
+from app.server import scheduler
+from app.server.models import StatusCheckKind
+from app.server.scheduler import DeliveryScheduler
+
+LPK = StatusCheckKind.LAPAKGAMING
+
+
+def test_slow_check_does_not_block_others(monkeypatch):
+    async def main():
+        release = asyncio.Event()
+        checked: list[str] = []
+
+        async def check(key: str) -> bool:
+            if key == "slow":
+                await release.wait()
+            checked.append(key)
+            return True
+
+        monkeypatch.setitem(scheduler.CHECKERS, LPK, check)
+        delivery_scheduler = DeliveryScheduler(max_failures=1)
+        delivery_scheduler._task = asyncio.create_task(delivery_scheduler.run())
+
+        delivery_scheduler.schedule(LPK, "slow")
+        await asyncio.sleep(0.01)
+        delivery_scheduler.schedule(LPK, "fast", delay=0.01)
+        await asyncio.sleep(0.05)
+        assert checked == ["fast"]
+
+        release.set()
+        await asyncio.sleep(0.01)
+        assert checked == ["fast", "slow"]
+        await delivery_scheduler.stop()
+
+    asyncio.run(main())
+
+
+def test_due_check_in_flight_runs_again(monkeypatch):
+    async def main():
+        release = asyncio.Event()
+        calls: list[str] = []
+
+        async def check(key: str) -> bool:
+            calls.append(key)
+            await release.wait()
+            return True
+
+        monkeypatch.setitem(scheduler.CHECKERS, LPK, check)
+        delivery_scheduler = DeliveryScheduler(max_failures=1)
+        delivery_scheduler._task = asyncio.create_task(delivery_scheduler.run())
+
+        delivery_scheduler.schedule(LPK, "tid")
+        await asyncio.sleep(0.01)
+        delivery_scheduler.schedule(LPK, "tid")
+        await asyncio.sleep(0.01)
+        # Never two checks of one order at once
+        assert calls == ["tid"]
+
+        release.set()
+        await asyncio.sleep(0.01)
+        assert calls == ["tid", "tid"]
+        await delivery_scheduler.stop()
+
+    asyncio.run(main())
+
+
+def test_stop_awaits_checks_in_flight(monkeypatch):
+    async def main():
+        cancelled = asyncio.Event()
+
+        async def check(key: str) -> bool:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return True
+
+        monkeypatch.setitem(scheduler.CHECKERS, LPK, check)
+        delivery_scheduler = DeliveryScheduler(max_failures=1)
+        run_task = asyncio.create_task(delivery_scheduler.run())
+        delivery_scheduler._task = run_task
+
+        delivery_scheduler.schedule(LPK, "tid")
+        await asyncio.sleep(0.01)
+        await delivery_scheduler.stop()
+
+        assert cancelled.is_set()
+        assert run_task.done()
+
+    asyncio.run(main())
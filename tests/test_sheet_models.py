@@ -0,0 +1,16 @@
+from app.sheet.models import RowModel
+
+
+def test_column_schema():
+    assert RowModel.column_schema.note_column == "G"
+    assert RowModel.updated_mapping_fields()["NOTE"] == "G"
+    assert RowModel.column_schema.field_by_column["E"] == "code"
+
+
+def test_mapping_fields_is_a_copy():
+    mapping_fields = RowModel.mapping_fields()
+    mapping_fields.pop("code")
+    RowModel.updated_mapping_fields().clear()
+
+    assert RowModel.mapping_fields()["code"] == "E"
+    assert "NOTE" in RowModel.updated_mapping_fields()
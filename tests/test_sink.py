@@ -0,0 +1,52 @@
+import pytest
+
+from app.sheet.sink import WriteBehindSink
+
+
+class FakeModel:
+    writes: list[dict[int, list]] = []
+    fail = False
+
+    @staticmethod
+    def updated_mapping_fields() -> dict[str, str]:
+        return {"status": "A", "note": "B"}
+
+    @classmethod
+    def batch_update_rows(cls, sheet_id, sheet_name, field_names, rows) -> None:
+        if cls.fail:
+            raise ConnectionError("sheets down")
+        cls.writes.append(rows)
+
+
+@pytest.fixture
+def sink():
+    FakeModel.writes = []
+    FakeModel.fail = False
+    return WriteBehindSink(
+        FakeModel, "sheet", "log", row_allocator=None, flush_interval=1
+    )
+
+
+def test_updates_of_a_row_are_coalesced(sink):
+    sink.submit(2, {"status": "pending", "note": None})
+    sink.submit(2, {"note": "created"})
+    sink.submit(3, {"status": "done"})
+    sink.flush()
+
+    assert FakeModel.writes == [{2: ["pending", "created"], 3: ["done", None]}]
+
+    sink.flush()
+    assert len(FakeModel.writes) == 1
+
+
+def test_failed_flush_is_requeued_under_newer_updates(sink):
+    sink.submit(2, {"status": "pending", "note": "created"})
+    FakeModel.fail = True
+    with pytest.raises(ConnectionError):
+        sink.flush()
+
+    sink.submit(2, {"status": "done"})
+    FakeModel.fail = False
+    sink.flush()
+
+    assert FakeModel.writes == [{2: ["done", "created"]}]
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from app.shared.enums import StoreBackend
+from app.shared.stores import LogKeyValueStore, create_store
+
+
+@pytest.fixture(params=list(StoreBackend))
+def store(request, tmp_path):
+    return create_store(request.param, "test", tmp_path)
+
+
+def test_batch_operations(store):
+    store.set_many({"a": "1", "b": "2", "c": "3"})
+    assert store.get_many(["a", "c", "missing"]) == {"a": "1", "c": "3"}
+
+    store.delete_many(["a", "b"])
+    assert store.keys() == ["c"]
+
+
+def test_delete_many_missing_key_deletes_nothing(store):
+    store.set_many({"a": "1", "b": "2"})
+
+    with pytest.raises(KeyError):
+        store.delete_many(["a", "missing"])
+
+    assert sorted(store.keys()) == ["a", "b"]
+
+
+def test_delete_missing_key(store):
+    with pytest.raises(KeyError):
+        store.delete("missing")
+
+
+def test_log_store_drops_torn_tail(tmp_path):
+    store = LogKeyValueStore("test", tmp_path)
+    store.set("a", "1")
+    store.set("b", "2")
+    store._log_file.close()
+
+    log_file = tmp_path / "test.log"
+    valid_size = log_file.stat().st_size
+    with open(log_file, "a") as f:
+        f.write('{"k": "c", "v": ')
+
+    reloaded = LogKeyValueStore("test", tmp_path)
+    assert reloaded.get_many(["a", "b", "c"]) == {"a": "1", "b": "2"}
+    assert log_file.stat().st_size == valid_size
+
+    reloaded.set("c", "3")
+    assert LogKeyValueStore("test", tmp_path).get("c") == "3"
+
+
+def test_log_store_delete_many_is_one_append(tmp_path, monkeypatch):
+    store = LogKeyValueStore("test", tmp_path)
+    store.set_many({"a": "1", "b": "2", "c": "3"})
+
+    fsyncs = []
+    monkeypatch.setattr(os, "fsync", fsyncs.append)
+    store.delete_many(["a", "b"])
+
+    assert len(fsyncs) == 1
+    assert LogKeyValueStore("test", tmp_path).keys() == ["c"]
+
+
+def test_log_store_compacts(tmp_path):
+    store = LogKeyValueStore("test", tmp_path, compact_min_records=10)
+    for i in range(20):
+        store.set("a", str(i))
+
+    assert store.record_count <= 10
+    assert LogKeyValueStore("test", tmp_path).get("a") == "19"
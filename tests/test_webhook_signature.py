@@ -0,0 +1,15 @@
+import hashlib
+import hmac
+
+from app.server.routes.g2g.utils import WebhookSignatureVerifier
+
+
+def test_verify_matches_plain_hmac():
+    verifier = WebhookSignatureVerifier("https://hook.test", "user", "secret")
+    signature = hmac.new(
+        b"secret", b"https://hook.testuser1700000000000", hashlib.sha256
+    ).hexdigest()
+
+    assert verifier.sign("1700000000000") == signature
+    assert verifier.verify("1700000000000", signature)
+    assert not verifier.verify("1700000000001", signature)